@@ -1,10 +1,16 @@
 from datetime import datetime, timedelta, timezone
+import hashlib
+import time
+from cachetools import LRUCache
 from jose import JWTError, jwt
-from utils.config import get_JWT_settings
+from utils.config import get_JWT_settings, get_token_cache_settings
 from fastapi import HTTPException, status
 from fastapi import Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 ALGORITHM,SECRET_KEY,ACCESS_TOKEN_EXPIRE_MINUTES=get_JWT_settings()
+# Verified claims keyed by token digest, so repeat requests skip signature checks
+_verified_tokens = LRUCache(maxsize=get_token_cache_settings())
+auth_stats = {"request_memo_hits": 0, "cache_hits": 0, "verifications": 0, "verify_ms_total": 0.0}
 
 
 def create_access_token(username: str, user_id: int, expires_delta: timedelta = timedelta(hours=1)):
@@ -23,8 +29,40 @@ def verify_token(token: str):
         return payload  
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
-    except jwt.InvalidTokenError:
+    except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+def verify_token_cached(token: str):
+    """
+    verify_token with a bounded cache of verified claims keyed by the token's
+    SHA-256 digest. Cached claims are only reused until their `exp`.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = _verified_tokens.get(key)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            auth_stats["cache_hits"] += 1
+            return payload
+        _verified_tokens.pop(key, None)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
+
+    started = time.perf_counter()
+    try:
+        payload = verify_token(token)
+    finally:
+        auth_stats["verifications"] += 1
+        auth_stats["verify_ms_total"] += (time.perf_counter() - started) * 1000
+    if "exp" in payload:
+        _verified_tokens[key] = payload
+    return payload
+
+def get_auth_stats() -> dict:
+    verifications = auth_stats["verifications"]
+    return {
+        **auth_stats,
+        "avg_verify_ms": round(auth_stats["verify_ms_total"] / verifications, 3) if verifications else 0.0,
+        "cached_tokens": len(_verified_tokens),
+    }
     
 
 class JWTBearer(HTTPBearer):
@@ -32,11 +70,17 @@ class JWTBearer(HTTPBearer):
         super(JWTBearer, self).__init__(auto_error=auto_error)
 
     async def __call__(self, request: Request):
+        # Several JWTBearer dependencies on one route share the first verification
+        payload = getattr(request.state, "jwt_payload", None)
+        if payload is not None:
+            auth_stats["request_memo_hits"] += 1
+            return payload
         credentials: HTTPAuthorizationCredentials = await super(JWTBearer, self).__call__(request)
         if credentials:
             if credentials.scheme != "Bearer":
                 raise HTTPException(status_code=403, detail="Invalid authentication scheme.")
-            payload = verify_token(credentials.credentials)
+            payload = verify_token_cached(credentials.credentials)
+            request.state.jwt_payload = payload
             return payload
         else:
             raise HTTPException(status_code=403, detail="Invalid authorization token.")
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+Compare two benchmarks.service_load reports, e.g. before and after a change.
+
+    python -m benchmarks.compare before.json after.json
+
+Rows are matched on (library size, scenario, concurrency); throughput and
+p50/p95/p99 deltas are shown as percentages of the baseline.
+"""
+import argparse
+import json
+
+
+def _rows(report: dict) -> dict:
+    rows = {}
+    for run in report["runs"]:
+        for s in run["scenarios"]:
+            rows[(run["library_size"], s["scenario"], s["concurrency"])] = s
+    return rows
+
+
+def _delta(old, new) -> str:
+    if not old or new is None:
+        return "-"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    print(f"baseline  {baseline['commit'][:10]}{' (dirty)' if baseline.get('dirty') else ''}  {baseline['created_at']}")
+    print(f"candidate {candidate['commit'][:10]}{' (dirty)' if candidate.get('dirty') else ''}  {candidate['created_at']}")
+    if baseline["config"] != candidate["config"]:
+        changed = sorted(k for k in baseline["config"].keys() | candidate["config"].keys()
+                         if baseline["config"].get(k) != candidate["config"].get(k))
+        print(f"warning: benchmark settings differ ({', '.join(changed)})")
+
+    print(f"{'library':>9} {'scenario':>8} {'conc':>5} {'throughput':>11} {'p50':>8} {'p95':>8} {'p99':>8}")
+    old_rows, new_rows = _rows(baseline), _rows(candidate)
+    for key in sorted(old_rows.keys() & new_rows.keys(), key=lambda k: (k[0], k[1], k[2] or 0)):
+        old, new = old_rows[key], new_rows[key]
+        rate = lambda s: s.get("throughput_rps", s.get("items_per_s"))
+        print(f"{key[0]:>9} {key[1]:>8} {key[2] or '-':>5} {_delta(rate(old), rate(new)):>11} "
+              + " ".join(f"{_delta(old['latency_ms'][p], new['latency_ms'][p]):>8}" for p in ("p50", "p95", "p99")))
+    for key in sorted(old_rows.keys() ^ new_rows.keys(), key=lambda k: (k[0], k[1], k[2] or 0)):
+        print(f"only in {'baseline' if key in old_rows else 'candidate'}: {key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Offline stand-in for AsyncOpenAI used by the benchmarks.
+
+Chat completions and embeddings sleep for a configurable latency, return
+answers shaped like the real ones (JSON enrichment, query type, plain text)
+and can fail at a configurable rate with the SDK's own exception types, so
+the rate limiter and fallbacks are exercised exactly as in production.
+Embeddings are derived from a hash of the input, so identical texts get
+identical vectors across runs and processes.
+"""
+import asyncio
+import hashlib
+import json
+import random
+from types import SimpleNamespace
+import httpx
+import numpy as np
+import openai
+
+_REQUEST = httpx.Request("POST", "https://api.openai.com/v1")
+WORDS = ("design", "python", "travel", "recipe", "budget", "science", "music", "history", "health", "startup")
+
+
+def deterministic_embedding(text: str, dimensions: int) -> np.ndarray:
+    """Unit-length float32 vector seeded by the text."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeAsyncOpenAI:
+    """
+    Implements the subset of AsyncOpenAI the app calls: chat.completions.create,
+    embeddings.create and close. `latency_ms` is the mean per call (with
+    +/- `jitter` relative spread); `error_rate` is the share of calls that
+    raise (rate limits and timeouts, split evenly).
+    """
+
+    def __init__(self, dimensions: int = 3072, chat_latency_ms: float = 400, embedding_latency_ms: float = 80,
+                 jitter: float = 0.25, error_rate: float = 0.0, seed: int = 0):
+        self.dimensions = dimensions
+        self.chat_latency_ms = chat_latency_ms
+        self.embedding_latency_ms = embedding_latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.stats = {"chat_calls": 0, "embedding_calls": 0, "embedded_texts": 0, "injected_errors": 0}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_chat_completion))
+        self.embeddings = SimpleNamespace(create=self._create_embeddings)
+
+    async def _delay(self, latency_ms: float):
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms * self._random.uniform(1 - self.jitter, 1 + self.jitter) / 1000)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.stats["injected_errors"] += 1
+            if self._random.random() < 0.5:
+                response = httpx.Response(429, headers={"retry-after": "0.05"}, request=_REQUEST)
+                raise openai.RateLimitError("Injected rate limit", response=response, body=None)
+            raise openai.APITimeoutError(request=_REQUEST)
+
+    def _answer(self, messages: list, max_tokens: int = None, response_format: dict = None) -> str:
+        content = messages[-1]["content"] if messages else ""
+        text = content if isinstance(content, str) else " ".join(p.get("text", "") for p in content)
+        words = [w for w in WORDS if w in text.lower()] or list(WORDS[:3])
+        if response_format and response_format.get("type") == "json_schema":
+            return json.dumps({"title": f"Notes on {words[0]}", "summary": f"A short note about {', '.join(words)}.",
+                               "tags": words[:5], "categories": ["Tech"]})
+        if response_format:
+            return json.dumps({"categories": ["Tech"]})
+        if max_tokens == 5:
+            # Query type classification
+            return "all"
+        return f"A short note about {', '.join(words)}."
+
+    async def _create_chat_completion(self, model: str, messages: list, max_tokens: int = None, response_format: dict = None, **kwargs):
+        self.stats["chat_calls"] += 1
+        await self._delay(self.chat_latency_ms)
+        answer = self._answer(messages, max_tokens, response_format)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer), finish_reason="stop", index=0)],
+            usage=SimpleNamespace(total_tokens=len(answer) // 3 + 50),
+        )
+
+    async def _create_embeddings(self, model: str, input, dimensions: int = None, **kwargs):
+        texts = [input] if isinstance(input, str) else list(input)
+        self.stats["embedding_calls"] += 1
+        self.stats["embedded_texts"] += len(texts)
+        # Larger batches take a little longer, as with the real API
+        await self._delay(self.embedding_latency_ms * (1 + len(texts) / 256))
+        size = dimensions or self.dimensions
+        data = [SimpleNamespace(embedding=deterministic_embedding(t, size).tolist(), index=i) for i, t in enumerate(texts)]
+        return SimpleNamespace(data=data, usage=SimpleNamespace(total_tokens=sum(len(t) // 3 + 1 for t in texts)))
+
+    async def close(self):
+        pass
@@ -0,0 +1,394 @@
+"""
+End-to-end load benchmark of POST /add, POST /add/bulk and GET /data/search,
+fully offline: OpenAI is replaced by benchmarks.fake_openai and MongoDB by
+mongomock (in-process) or a throwaway database on a local mongod.
+
+For every library size the user's library is seeded directly with synthetic
+documents, then each scenario is driven through the ASGI app in-process at
+every concurrency level. Results (throughput, latency percentiles, memory)
+are written as JSON tagged with the git commit, so runs can be compared
+across commits with benchmarks.compare. The run fails if documents added
+during the scenarios are missing from the resident vector index.
+
+    python -m benchmarks.service_load --library-sizes 1000 100000 --concurrency 1 16 64 --output before.json
+    python -m benchmarks.service_load --mongo-url mongodb://localhost:27017 --chat-latency-ms 600 --error-rate 0.02
+
+App settings come from the environment / .env as usual. The OpenAI per-minute
+quotas default to 0 (unlimited) here so the limiter does not dominate the
+numbers; export OPENAI_CHAT_RPM etc. to benchmark throttled behaviour.
+Embeddings are stored as float32 binary unless EMBEDDING_STORAGE_FORMAT is set.
+With EMBEDDING_PROVIDER=local the real local model is benchmarked (only chat calls are faked).
+
+mongomock has no indexes, so its share of each request grows with the library;
+every scenario reports a per-stage breakdown (LLM, embedding, Mongo, local
+search) to tell the two apart. Use --mongo-url for absolute numbers at 100k+.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+# Must be set before the app modules read their configuration
+for _name, _value in {
+    "LOG_LEVEL": "ERROR", "INDEX_MANAGEMENT": "ensure", "INGEST_MODE": "sync",
+    # mongomock deep-copies every element of array-stored vectors on each query, which would dominate the numbers
+    "EMBEDDING_STORAGE_FORMAT": "float32",
+    "OPENAI_API_KEY": "offline", "collection": "users", "ALGORITHM": "HS256",
+    "SECRET_KEY": "benchmark-secret", "ACCESS_TOKEN_EXPIRE_MINUTES": "600",
+    "OPENAI_CHAT_RPM": "0", "OPENAI_CHAT_TPM": "0", "OPENAI_EMBEDDING_RPM": "0", "OPENAI_EMBEDDING_TPM": "0",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+import httpx
+from benchmarks.fake_openai import FakeAsyncOpenAI, WORDS
+
+try:
+    import mongomock
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:  # optional dependency, only needed without --mongo-url
+    mongomock = AsyncMongoMockClient = None
+
+SCENARIOS = ("search", "add", "bulk")
+SEED_CHUNK = 5000
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_revision() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def memory_stats() -> dict:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    stats = {"peak_rss_mb": round(peak / 2 ** 20, 1)}
+    try:
+        with open("/proc/self/statm") as f:
+            stats["rss_mb"] = round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except OSError:
+        pass
+    return stats
+
+
+def summarize(latencies: list, elapsed: float, errors: int) -> dict:
+    ms = np.asarray(latencies, dtype=np.float64) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(float(np.percentile(ms, 50)), 2) if len(ms) else None,
+            "p95": round(float(np.percentile(ms, 95)), 2) if len(ms) else None,
+            "p99": round(float(np.percentile(ms, 99)), 2) if len(ms) else None,
+            "mean": round(float(ms.mean()), 2) if len(ms) else None,
+            "max": round(float(ms.max()), 2) if len(ms) else None,
+        },
+    }
+
+
+def stage_totals() -> dict:
+    from core.metrics import LLM_DURATION, EMBEDDING_DURATION, MONGO_DURATION, LOCAL_SEARCH_DURATION
+    totals = {}
+    for prefix, histogram in (("llm", LLM_DURATION), ("embedding", EMBEDDING_DURATION),
+                              ("mongo", MONGO_DURATION), ("local_search", LOCAL_SEARCH_DURATION)):
+        for key, value in histogram.totals().items():
+            totals[".".join((prefix,) + key)] = value
+    return totals
+
+
+def stage_breakdown(before: dict, after: dict) -> dict:
+    """Calls and mean time per pipeline stage between two stage_totals() snapshots."""
+    stages = {}
+    for name, (count, total) in sorted(after.items()):
+        calls = count - before.get(name, (0, 0.0))[0]
+        if calls:
+            stages[name] = {"calls": calls, "mean_ms": round((total - before.get(name, (0, 0.0))[1]) / calls * 1000, 2)}
+    return stages
+
+
+def synthetic_text(rng: random.Random, words: int = 40) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+async def seed_library(user_id: str, size: int, dimensions: int, seed: int):
+    """Insert `size` enriched documents with random unit vectors, bypassing the pipeline."""
+    from core.add_data import attach_embedding
+    from core.resources import get_resources
+
+    rng = np.random.default_rng(seed)
+    data_col = get_resources().data_col
+    now = datetime.now(timezone.utc)
+    for start in range(0, size, SEED_CHUNK):
+        count = min(SEED_CHUNK, size - start)
+        vectors = rng.standard_normal((count, dimensions), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        docs = []
+        for i, vector in enumerate(vectors):
+            word = WORDS[(start + i) % len(WORDS)]
+            # Same embedding fields (format, model, dimension) as documents saved through the app
+            docs.append(attach_embedding({
+                "user_id": user_id, "type": ("text", "url", "image")[(start + i) % 3],
+                "title": f"Note {start + i} on {word}", "content": "", "summary": f"Synthetic note about {word}.",
+                "tags": [word], "category": ["Tech"], "source_platform": "Benchmark", "media_url": None,
+                "created_at": now,
+            }, vector))
+        await data_col.insert_many(docs, ordered=False)
+
+
+async def vector_index_check(user_id: str) -> dict:
+    """
+    Rows of the user's resident vector index against their stored documents of
+    the active model. The index is loaded by the first search, so documents
+    added by the scenarios are only there if inserts update it in place.
+    """
+    from core.resources import get_resources
+    registry = get_resources().vector_indexes
+    index = await registry.get(user_id)
+    stored = await get_resources().data_col.count_documents({"user_id": user_id, **registry.doc_filter})
+    return {"resident_rows": index.size, "stored_documents": stored, "consistent": index.size == stored}
+
+
+def mongomock_client():
+    """
+    In-process store. Like a self-hosted mongod, it rejects $vectorSearch up
+    front; stock mongomock first copies the whole collection, which would make
+    the (expected) Atlas failure cost more than the search itself.
+    """
+    aggregate = mongomock.collection.Collection.aggregate
+
+    def aggregate_without_atlas(self, pipeline, *args, **kwargs):
+        if any("$vectorSearch" in stage for stage in pipeline):
+            raise mongomock.OperationFailure("$vectorSearch stage is only allowed on MongoDB Atlas")
+        return aggregate(self, pipeline, *args, **kwargs)
+
+    mongomock.collection.Collection.aggregate = aggregate_without_atlas
+    return AsyncMongoMockClient()
+
+
+async def drive(concurrency: int, requests: int, make_request) -> tuple[list, int, float, list]:
+    """Run `requests` calls of make_request(i) with `concurrency` in flight; returns latencies, errors, elapsed, responses."""
+    latencies, responses = [], []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await make_request(i)
+                ok = response.status_code < 400
+            except Exception:
+                response, ok = None, False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+            if ok:
+                responses.append(response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started, responses
+
+
+async def run_search(client, headers, concurrency: int, requests: int, distinct_queries: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    queries = [f"{synthetic_text(rng, 4)} {i}" for i in range(distinct_queries)]
+    picks = [rng.choice(queries) for _ in range(requests)]
+    latencies, errors, elapsed, responses = await drive(
+        concurrency, requests, lambda i: client.get("/data/search", headers=headers, params={"query": picks[i], "limit": 10}))
+    result = summarize(latencies, elapsed, errors)
+    result["cached_share"] = round(sum(r.json().get("cached", False) for r in responses) / len(responses), 3) if responses else 0.0
+    return result
+
+
+async def run_add(client, headers, concurrency: int, requests: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    texts = [synthetic_text(rng) for _ in range(requests)]
+    latencies, errors, elapsed, _ = await drive(
+        concurrency, requests, lambda i: client.post("/add", headers=headers, data={"data_type": "text", "text": texts[i]}))
+    return summarize(latencies, elapsed, errors)
+
+
+async def run_bulk(client, headers, items: int, seed: int) -> dict:
+    """One streamed import; latency here is the time until each item's result line arrives."""
+    rng = random.Random(seed)
+    body = "".join(json.dumps({"id": f"b{i}", "data_type": "text", "text": synthetic_text(rng)}) + "\n" for i in range(items))
+    arrivals, errors = [], 0
+    started = time.perf_counter()
+    async with client.stream("POST", "/add/bulk", headers={**headers, "Content-Type": "application/x-ndjson"}, content=body) as response:
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "summary" in entry:
+                continue
+            arrivals.append(time.perf_counter() - started)
+            errors += entry.get("status") != "ok"
+    result = summarize(arrivals, time.perf_counter() - started, errors)
+    result["items_per_s"] = result.pop("throughput_rps")
+    return result
+
+
+async def run_library(args, library_size: int) -> dict:
+    from core.add_data import embedding_batcher
+    from core.find_data import _query_type_cache
+    from core.indexes import ensure_indexes
+    from core.resources import resources
+    from main import app
+
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        mongo_client = AsyncIOMotorClient(args.mongo_url)
+        await mongo_client.drop_database(args.database)
+    else:
+        mongo_client = mongomock_client()
+    fake_ai = FakeAsyncOpenAI(args.dimensions, args.chat_latency_ms, args.embedding_latency_ms, args.jitter, args.error_rate, args.seed)
+    # Module-level memos would otherwise carry over between library sizes
+    _query_type_cache.clear()
+    batcher_before = dict(embedding_batcher.stats)
+
+    resources.start(mongo_client=mongo_client, ai_client=fake_ai)
+    run = {"library_size": library_size, "scenarios": []}
+    try:
+        await ensure_indexes(resources.db, resources.users_col.name)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await client.post("/signup", json={"name": "bench", "email": "bench@example.com", "password": "benchmark"})
+            token = (await client.post("/login", json={"email": "bench@example.com", "password": "benchmark"})).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            user = await resources.users_col.find_one({"email": "bench@example.com"})
+
+            started = time.perf_counter()
+            await seed_library(str(user["_id"]), library_size, args.dimensions, args.seed)
+            run["seed_s"] = round(time.perf_counter() - started, 3)
+
+            if "search" in args.scenarios:
+                # First search loads the user's vector index; reported separately from steady state
+                started = time.perf_counter()
+                await client.get("/data/search", headers=headers, params={"query": "warm up", "limit": 10})
+                run["search_cold_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            for concurrency in args.concurrency:
+                if "search" in args.scenarios:
+                    before = stage_totals()
+                    result = await run_search(client, headers, concurrency, args.requests, args.distinct_queries, args.seed)
+                    run["scenarios"].append({"scenario": "search", "concurrency": concurrency, **result,
+                                             "stages": stage_breakdown(before, stage_totals())})
+                if "add" in args.scenarios:
+                    before = stage_totals()
+                    result = await run_add(client, headers, concurrency, args.requests, args.seed + concurrency)
+                    run["scenarios"].append({"scenario": "add", "concurrency": concurrency, **result,
+                                             "stages": stage_breakdown(before, stage_totals())})
+            if "bulk" in args.scenarios:
+                before = stage_totals()
+                result = await run_bulk(client, headers, args.bulk_items, args.seed)
+                run["scenarios"].append({"scenario": "bulk", "concurrency": None, **result,
+                                         "stages": stage_breakdown(before, stage_totals())})
+
+            run["vector_index_check"] = await vector_index_check(str(user["_id"]))
+
+        run["memory"] = {**memory_stats(), "vector_index_mb": round(resources.vector_indexes.memory_bytes / 2 ** 20, 1)}
+        run["fake_openai"] = dict(fake_ai.stats)
+        run["embedding_batcher"] = {key: value - batcher_before.get(key, 0) for key, value in embedding_batcher.stats.items()}
+        if resources.search_cache is not None:
+            run["search_cache"] = resources.search_cache.get_stats()
+    finally:
+        await resources.close()
+        if args.mongo_url:
+            await mongo_client.drop_database(args.database)
+        mongo_client.close()
+    return run
+
+
+def print_table(report: dict):
+    print(f"{'library':>9} {'scenario':>8} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for run in report["runs"]:
+        for s in run["scenarios"]:
+            rate = s.get("throughput_rps", s.get("items_per_s"))
+            lat = s["latency_ms"]
+            print(f"{run['library_size']:>9} {s['scenario']:>8} {s['concurrency'] or '-':>5} {rate:>9} "
+                  f"{lat['p50']:>9} {lat['p95']:>9} {lat['p99']:>9} {s['errors']:>7}")
+
+
+async def run_all(args) -> dict:
+    report = {
+        "benchmark": "service_load",
+        **git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "runs": [],
+    }
+    from core.add_data import EMBEDDING_MODEL, EMBEDDING_STORAGE_FORMAT, EMBEDDING_DIMENSIONS
+    from utils.config import get_ann_settings
+    report["config"].update({
+        "store": "mongodb" if args.mongo_url else "mongomock",
+        "embedding_provider": os.environ.get("EMBEDDING_PROVIDER", "openai"),
+        "embedding_model": EMBEDDING_MODEL,
+        "embedding_storage_format": EMBEDDING_STORAGE_FORMAT,
+        "embedding_dimensions": EMBEDDING_DIMENSIONS,
+        "ann_backend": get_ann_settings()[0],
+    })
+    for library_size in args.library_sizes:
+        report["runs"].append(await run_library(args, library_size))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--library-sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--bulk-items", type=int, default=500)
+    parser.add_argument("--distinct-queries", type=int, default=50, help="Fewer distinct queries means more search cache hits")
+    parser.add_argument("--dimensions", type=int, default=None, help="Embedding size (default: the configured model's)")
+    parser.add_argument("--chat-latency-ms", type=float, default=400)
+    parser.add_argument("--embedding-latency-ms", type=float, default=80)
+    parser.add_argument("--jitter", type=float, default=0.25)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of OpenAI calls that fail with a 429 or timeout")
+    parser.add_argument("--mongo-url", help="Use a real MongoDB (the --database is dropped before and after) instead of mongomock")
+    parser.add_argument("--database", default="synapse_bench")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    if not args.mongo_url and AsyncMongoMockClient is None:
+        parser.error("mongomock-motor is not installed; pip install mongomock-motor or pass --mongo-url")
+    # Never point the benchmark at the application's database
+    os.environ["mongodb"] = args.database
+    if args.dimensions is None:
+        from core.embeddings import get_embedding_provider
+        args.dimensions = get_embedding_provider().dimensions
+
+    report = asyncio.run(run_all(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print_table(report)
+        print(f"Report written to {args.output} ({report['commit'][:10]}{' dirty' if report['dirty'] else ''})")
+    else:
+        print(json.dumps(report, indent=2, default=str))
+    stale = [run for run in report["runs"] if not run["vector_index_check"]["consistent"]]
+    for run in stale:
+        print(f"error: resident vector index out of sync at library size {run['library_size']}: {run['vector_index_check']}", file=sys.stderr)
+    if stale:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Micro-benchmark: top-k selection in the local cosine fallback.
+
+Compares the previous approach (a dict per candidate + sorted() over all of
+them) with core.vector_index.top_k (argpartition + sort of the k winners).
+
+    python -m benchmarks.topk_selection --sizes 1000 10000 100000 --k 5
+"""
+import argparse
+import time
+import numpy as np
+from core.vector_index import top_k
+
+
+def _sorted_dicts(rows, scores, k):
+    scored = [{"row": int(r), "score": s} for r, s in zip(rows, scores)]
+    return sorted(scored, key=lambda x: x["score"], reverse=True)[:k]
+
+
+def _best_of(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'N':>10} {'sorted() ms':>12} {'top_k ms':>10} {'speedup':>8}")
+    for n in args.sizes:
+        rows = np.arange(n)
+        scores = rng.random(n, dtype=np.float32)
+        expected = [d["row"] for d in _sorted_dicts(rows, scores, args.k)]
+        assert top_k(rows, scores, args.k)[0].tolist() == expected
+
+        baseline = _best_of(lambda: _sorted_dicts(rows, scores, args.k), args.repeats)
+        partial = _best_of(lambda: top_k(rows, scores, args.k), args.repeats)
+        print(f"{n:>10} {baseline:>12.2f} {partial:>10.3f} {baseline / partial:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,57 @@
-import os, re, requests
+import re
+import asyncio
+import time
+from contextvars import ContextVar
 from datetime import datetime, timezone
 from fastapi import HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
-from PIL import Image
-import io
+from pymongo.errors import DuplicateKeyError
 import json
-import newspaper
-from openai import AsyncOpenAI
-from utils.config import load_environments,get_scraper
+from utils.config import get_enrichment_settings,get_embedding_settings,get_embedding_storage_settings,get_image_settings
+from core.resources import get_resources
+from core.embedding_batcher import EmbeddingBatcher, split_batches, clamp_text, embed_isolated
+from core.embedding_codec import encode_embedding
+from core.embeddings import get_embedding_provider
+from core.image_processing import compress_image
+from core.workers import run_in_process
+from core.metrics import LLM_DURATION, EMBEDDING_DURATION, URL_FETCH_DURATION, MONGO_DURATION, AI_FALLBACKS
+from core.tracing import span
+from core.log import get_logger
 import base64
 from urllib.parse import urlparse
-from bs4 import BeautifulSoup
-mongodb_URL,mongodb,collection,collection2,OPENAI_API_KEY=load_environments()
-client = AsyncIOMotorClient(mongodb_URL)
-db = client[mongodb]
-data_col = db["data"]
-EMBEDDING_MODEL = "text-embedding-3-large"
-ai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+_, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_WAIT_MS, EMBEDDING_BATCH_MAX_TOKENS, EMBEDDING_BATCH_CONCURRENCY = get_embedding_settings()
+# OpenAI or a local model (EMBEDDING_PROVIDER); the model name is recorded on every stored document
+embedding_provider = get_embedding_provider()
+EMBEDDING_MODEL = embedding_provider.model
+ENRICHMENT_MODE = get_enrichment_settings()
+IMAGE_MAX_SIDE, IMAGE_FORMAT, IMAGE_QUALITY = get_image_settings()
+EMBEDDING_STORAGE_FORMAT, EMBEDDING_DIMENSIONS = get_embedding_storage_settings()
+logger = get_logger("synapse.ingest")
+# Helpers that fell back to a placeholder during the current enrich_content call
+_enrichment_fallbacks = ContextVar("enrichment_fallbacks", default=None)
+
+
+def _record_fallback(helper: str, fallback: str, error=None):
+    """Count (and log) an LLM helper answering with a placeholder instead of model output."""
+    AI_FALLBACKS.inc(helper=helper, fallback=fallback)
+    fallbacks = _enrichment_fallbacks.get()
+    if fallbacks is not None:
+        fallbacks.append(helper)
+    logger.warning("ai_fallback", extra={"helper": helper, "fallback": fallback, "error": str(error) if error else None})
+
+
 async def ai_generate_summary(content: str):
     """Summarize the content using GPT."""
     try:
         prompt = f"Summarize this text in 2-3 lines:\n\n{content}"
-        res = await ai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=120
-        )
+        with span("llm.summary", LLM_DURATION, helper="summary"):
+            res = await get_resources().ai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=120
+            )
         return res.choices[0].message.content.strip()
-    except Exception:
+    except Exception as e:
+        _record_fallback("summary", "Summary unavailable.", e)
         return "Summary unavailable."
 
 async def ai_generate_tags(content: str):
@@ -43,14 +67,16 @@ async def ai_generate_tags(content: str):
     f"**Content:**\n{content}\n\n"
     "**JSON Output:**")
     try:
-        res = await ai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=60
-        )
+        with span("llm.tags", LLM_DURATION, helper="tags"):
+            res = await get_resources().ai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=60
+            )
         tags = re.findall(r'\b\w+\b', res.choices[0].message.content)
         return list({t.lower() for t in tags[:5]})
-    except Exception:
+    except Exception as e:
+        _record_fallback("tags", "[]", e)
         return []
 
 async def ai_classify_category(content: str) -> list[str]:
@@ -69,35 +95,45 @@ async def ai_classify_category(content: str) -> list[str]:
 
     try:
         # Create completion request
-        res = await ai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=150,
-            response_format={"type": "json_object"}  
-        )
+        with span("llm.category", LLM_DURATION, helper="category"):
+            res = await get_resources().ai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=150,
+                response_format={"type": "json_object"}  
+            )
         message = res.choices[0].message
         raw_output = getattr(message, "content", None)
-        categories = []
-        if raw_output:
-            try:
-                
-                parsed = json.loads(raw_output)
-                categories = parsed.get("categories", [])
-            except json.JSONDecodeError as je:
-                categories = []
-
-        # Default fallback
-        if not categories:
-            categories = ["General"]
-
-        # Clean formatting
-        clean_categories = [c.strip().title() for c in categories if isinstance(c, str)]
-        return clean_categories
+        raw_categories = _parse_json_object(raw_output).get("categories", [])
+        if not isinstance(raw_categories, list) or not any(isinstance(c, str) and c.strip() for c in raw_categories):
+            # Malformed or empty answer; a real "General" from the model is not a fallback
+            _record_fallback("category", "General")
+        return _clean_categories(raw_categories)
 
     except Exception as e:
+        _record_fallback("category", "General", e)
         return ["General"]
 
 
+def _parse_json_object(raw_output) -> dict:
+    """Parse a JSON-object completion, returning {} when it is missing or malformed."""
+    if not raw_output:
+        return {}
+    try:
+        parsed = json.loads(raw_output)
+    except json.JSONDecodeError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _clean_categories(categories) -> list[str]:
+    """Title-case the categories, defaulting to ["General"] when none are usable."""
+    if not isinstance(categories, list):
+        categories = []
+    clean_categories = [c.strip().title() for c in categories if isinstance(c, str) and c.strip()]
+    return clean_categories or ["General"]
+
+
 def extract_source_platform(url: str) -> str:
     """Extract platform name from URL."""
     try:
@@ -113,6 +149,15 @@ def extract_source_platform(url: str) -> str:
     except Exception:
         return "Web"
 
+async def _embed_batch(texts: list[str]) -> list[list[float]]:
+    """Embed several inputs in one provider call (API request or local batch); results come back in input order."""
+    texts = [clamp_text(text, embedding_provider.max_input_tokens) for text in texts]
+    with span("embedding", EMBEDDING_DURATION):
+        return await embedding_provider.embed(texts)
+
+# Concurrent generate_embedding calls within a few ms share one API request / local batch
+embedding_batcher = EmbeddingBatcher(_embed_batch, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_WAIT_MS, EMBEDDING_BATCH_MAX_TOKENS)
+
 async def generate_embedding(text: str) -> list[float]:
     """
     Generate a semantic embedding vector for combined text data.
@@ -122,72 +167,154 @@ async def generate_embedding(text: str) -> list[float]:
         if not text or len(text.strip()) == 0:
             return []
 
-        response = await ai_client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=text
-        )
+        embedding_cache = get_resources().embedding_cache
+        if embedding_cache is not None:
+            cached = await embedding_cache.get(EMBEDDING_MODEL, text)
+            if cached is not None:
+                return cached
+
+        embedding = await embedding_batcher.embed(text)
+
+        if embedding_cache is not None:
+            await embedding_cache.set(EMBEDDING_MODEL, text, embedding)
+        return embedding
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Embedding generation failed: {str(e)}")
 
-        return response.data[0].embedding
+async def generate_embeddings(texts: list[str]) -> list[list[float]]:
+    """
+    Bulk variant of generate_embedding for imports and maintenance jobs.
+    Returns one embedding per input text, in order ([] for empty texts and
+    for inputs the model rejected). Cached texts are skipped, duplicates are
+    embedded once and the rest are split into requests that stay under the
+    batch size and token limits. Raises only when no input could be embedded.
+    """
+    try:
+        results = [[] for _ in texts]
+        wanted = [i for i, text in enumerate(texts) if text and text.strip()]
+        if not wanted:
+            return results
+
+        embedding_cache = get_resources().embedding_cache
+        if embedding_cache is not None:
+            cached = await embedding_cache.get_many(EMBEDDING_MODEL, [texts[i] for i in wanted])
+        else:
+            cached = [None] * len(wanted)
+
+        missing = {}
+        for i, embedding in zip(wanted, cached):
+            if embedding is not None:
+                results[i] = embedding
+            else:
+                missing.setdefault(texts[i], []).append(i)
+        if not missing:
+            return results
+
+        unique_texts = list(missing)
+        batches = split_batches(unique_texts, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_MAX_TOKENS)
+        semaphore = asyncio.Semaphore(EMBEDDING_BATCH_CONCURRENCY)
+
+        async def run_batch(batch):
+            async with semaphore:
+                # A rejected input fails alone instead of taking its whole batch down
+                return await embed_isolated(_embed_batch, [unique_texts[j] for j in batch])
+
+        outputs = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        embedded_texts, new_embeddings, errors = [], [], []
+        for batch, embeddings in zip(batches, outputs):
+            for j, embedding in zip(batch, embeddings):
+                if isinstance(embedding, Exception):
+                    errors.append(embedding)
+                    continue
+                embedded_texts.append(unique_texts[j])
+                new_embeddings.append(embedding)
+                for i in missing[unique_texts[j]]:
+                    results[i] = embedding
+        if errors and not new_embeddings:
+            raise errors[0]
+        if errors:
+            logger.warning("embedding_inputs_failed", extra={"failed": len(errors), "error": str(errors[0])})
+
+        if embedding_cache is not None and embedded_texts:
+            await embedding_cache.set_many(EMBEDDING_MODEL, embedded_texts, new_embeddings)
+        return results
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Embedding generation failed: {str(e)}")
 
-def fetch_url_content(url: str):
-    """Extract readable text and title from a URL using newspaper3k."""
+async def fetch_url_content(url: str):
+    """Extract readable text and title from a URL (async download, newspaper3k parsing off the event loop)."""
     try:
-        
-        article = newspaper.Article(url)
-        article.download()
-        article.parse()
-        title = article.title if article.title else "Untitled"
-        text = article.text
-        
+        with span("url_fetch", URL_FETCH_DURATION):
+            title, text = await get_resources().url_fetcher.fetch(url)
+        title = title if title else "Untitled"
+
         if not text:
-            
+
             return title, "No readable content found."
 
         return title, text[:5000]  # Return title and cleaned text
 
     except Exception as e:
-        print(f"Error fetching with newspaper3k: {e}")
+        logger.warning("url_fetch_failed", extra={"url": url, "error": str(e)})
         # Raise the same exception your other code expects
         raise HTTPException(status_code=400, detail=f"Failed to fetch or parse URL content: {e}")
-def compress_image(image_bytes: bytes, max_size=(800, 800)):
-    image = Image.open(io.BytesIO(image_bytes))
-    image.thumbnail(max_size)
-    buf = io.BytesIO()
-    image.save(buf, format="PNG", optimize=True)
-    return buf.getvalue()
-async def ai_describe_image(image_bytes: bytes) -> str:
+
+async def fetch_url_contents(urls: list[str], concurrency: int = 16) -> list:
+    """
+    Batch variant of fetch_url_content: fetches up to `concurrency` URLs at once
+    (per-host limits still apply). Returns one (title, text) tuple or
+    HTTPException per URL, in order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(url):
+        async with semaphore:
+            return await fetch_url_content(url)
+
+    return await asyncio.gather(*(fetch_one(url) for url in urls), return_exceptions=True)
+
+async def preprocess_image(image_bytes: bytes):
+    """Downsize and re-encode an upload in the process pool. Returns (bytes, mime_type)."""
+    try:
+        with span("image.preprocess"):
+            return await run_in_process(compress_image, image_bytes, IMAGE_MAX_SIDE, IMAGE_FORMAT, IMAGE_QUALITY)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid or unsupported image: {e}")
+async def ai_describe_image(image_bytes: bytes, mime_type: str = "image/jpeg") -> str:
     """Generate a short caption for an image using GPT-4o."""
     try:
         # 1️⃣ Encode image bytes to Base64
         base64_image = base64.b64encode(image_bytes).decode("utf-8")
 
         # 2️⃣ Create a data URL
-        data_url = f"data:image/png;base64,{base64_image}"
+        data_url = f"data:{mime_type};base64,{base64_image}"
 
         # 3️⃣ Send to GPT-4o
-        res = await ai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "You are an AI generating descriptive ALT text. Provide a concise, 2-3 sentence description of the image. Focus on the main subject, a brief note of the setting, and any significant actions. Do not interpret emotions or intentions."},
-                        {"type": "image_url", "image_url": {"url": data_url}},
-                    ],
-                }
-            ],
-            max_tokens=150,
-        )
+        with span("llm.describe_image", LLM_DURATION, helper="describe_image"):
+            res = await get_resources().ai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": "You are an AI generating descriptive ALT text. Provide a concise, 2-3 sentence description of the image. Focus on the main subject, a brief note of the setting, and any significant actions. Do not interpret emotions or intentions."},
+                            {"type": "image_url", "image_url": {"url": data_url}},
+                        ],
+                    }
+                ],
+                max_tokens=150,
+            )
 
         description = res.choices[0].message.content.strip()
-        print("🖼️ AI Image Description:", description)
+        logger.debug("image_described", extra={"description": description})
+        if not description:
+            _record_fallback("describe_image", "Image description unavailable.")
         return description or "Image description unavailable."
 
     except Exception as e:
-        print("🔥 Error in ai_describe_image:", e)
+        _record_fallback("describe_image", "Image description unavailable.", e)
         return "Image description unavailable."
 
 
@@ -201,82 +328,268 @@ async def ai_generate_title(content: str) -> str:
             "that best represents the following content:\n\n"
             f"{content[:2000]}"  
         )
-        res = await ai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=20
-        )
+        with span("llm.title", LLM_DURATION, helper="title"):
+            res = await get_resources().ai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=20
+            )
         title = res.choices[0].message.content.strip()
         return title if title else "Untitled"
-    except Exception:
+    except Exception as e:
+        _record_fallback("title", "Untitled", e)
         return "Untitled"
 
 
-async def save_user_stuff(user_id: str, data_type: str, content:str=None, media_url: str = None):
-    """
-    Save user-uploaded text, image, or URL intelligently into MongoDB.
-    """
-    try:
-        if data_type not in ["text", "url", "image"]:
-            raise HTTPException(status_code=400, detail="Invalid data type")
-
-        summary = ""
-        tags = []
-        category = []
-        title = ""
-        source_platform = ""
-        stored_content = ""
-
-        if data_type == "text":
-            stored_content = content
-            summary = await ai_generate_summary(content)
-            tags = await ai_generate_tags(content)
-            category = await ai_classify_category(content)
-            title = await ai_generate_title(content)
-            source_platform = "Manual Entry"
-
-        elif data_type == "url":
-            title, url_content = fetch_url_content(content)
-            summary = await ai_generate_summary(url_content)
-            tags = await ai_generate_tags(url_content)
-            category = await ai_classify_category(url_content)
-            stored_content = url_content
-            source_platform = extract_source_platform(content)
-            media_url = content
-        elif data_type == "image":
-            summary = await ai_describe_image(content)
-            tags = await ai_generate_tags(summary)
-            category = await ai_classify_category(summary)
-            title = await ai_generate_title(summary)
-            stored_content = await ai_generate_summary(summary)  
-            source_platform = "User Upload"
-        combined_text = f"""
+def build_embedding_text(title: str, summary: str, content: str, tags: list, category) -> str:
+    """Combine a document's fields into the text that gets embedded."""
+    return f"""
         Title: {title}
         Summary: {summary}
-        Content: {stored_content}
+        Content: {content}
         Tags: {', '.join(tags) if tags else ''}
         Categories: {', '.join(category) if isinstance(category, list) else category}
         """
 
-        embedding_vector = await generate_embedding(combined_text)
-        doc = {
-            "user_id": user_id,
-            "type": data_type,
-            "title": title,
-            "content": stored_content,
-            "summary": summary,
-            "tags": tags,
-            "category": category,
-            "source_platform": source_platform,
-            "media_url": media_url,
-            "embedding": embedding_vector,
-            "created_at": datetime.now(timezone.utc)
-        }
-
-        await data_col.insert_one(doc)
-        return {"message": "Data saved successfully", "summary": summary, "tags": tags, "category": category}
+
+async def _timed_step(name: str, coro, timings: dict):
+    """Await a single enrichment step and record how long it took (in ms)."""
+    started = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+
+ENRICHMENT_SCHEMA = {
+    "name": "content_enrichment",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "summary": {"type": "string"},
+            "tags": {"type": "array", "items": {"type": "string"}},
+            "categories": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["title", "summary", "tags", "categories"],
+        "additionalProperties": False,
+    },
+}
+
+
+async def ai_enrich_fused(content: str) -> dict:
+    """
+    Generate title, summary, tags and categories with a single structured-output call.
+    Fields that are missing or malformed come back as None so the caller can
+    fall back to the dedicated per-field helpers.
+    """
+    prompt = (
+        "**Role:** You are an expert content analyst, indexer and taxonomist.\n\n"
+        "**Task:** Analyze the content below and return:\n"
+        "1.  **title:** A short, relevant and catchy title (max 10 words).\n"
+        "2.  **summary:** A 2-3 line summary of the text.\n"
+        "3.  **tags:** Exactly 5 unique, highly specific 1-3 word keyphrases capturing the core concepts.\n"
+        "4.  **categories:** 2–4 broad, high-level categories.\n\n"
+        f"**Content:**\n{content}\n\n"
+        "**JSON Output:**"
+    )
+    fields = {"title": None, "summary": None, "tags": None, "category": None}
+    try:
+        with span("llm.enrich_fused", LLM_DURATION, helper="enrich_fused"):
+            res = await get_resources().ai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=350,
+                response_format={"type": "json_schema", "json_schema": ENRICHMENT_SCHEMA}
+            )
+        parsed = _parse_json_object(getattr(res.choices[0].message, "content", None))
+    except Exception as e:
+        # Not a placeholder yet: the per-field helpers are tried next
+        AI_FALLBACKS.inc(helper="enrich_fused", fallback="per_field")
+        logger.warning("fused_enrichment_failed", extra={"error": str(e)})
+        return fields
+
+    title = parsed.get("title")
+    if isinstance(title, str) and title.strip():
+        fields["title"] = title.strip()
+
+    summary = parsed.get("summary")
+    if isinstance(summary, str) and summary.strip():
+        fields["summary"] = summary.strip()
+
+    tags = parsed.get("tags")
+    if isinstance(tags, list):
+        clean_tags = list(dict.fromkeys(t.strip().lower() for t in tags if isinstance(t, str) and t.strip()))
+        if clean_tags:
+            fields["tags"] = clean_tags[:5]
+
+    categories = parsed.get("categories")
+    if isinstance(categories, list) and any(isinstance(c, str) and c.strip() for c in categories):
+        fields["category"] = _clean_categories(categories)
+
+    return fields
+
+
+async def _enrich_fused(content: str, with_title: bool, timings: dict) -> dict:
+    """Fused enrichment: one structured call, per-field prompts only for malformed fields."""
+    fused = await _timed_step("fused_enrichment", ai_enrich_fused(content), timings)
+
+    fallbacks = {
+        "summary": ai_generate_summary,
+        "tags": ai_generate_tags,
+        "category": ai_classify_category,
+    }
+    if with_title:
+        fallbacks["title"] = ai_generate_title
+    missing = [name for name in fallbacks if fused.get(name) is None]
+    results = await asyncio.gather(*(_timed_step(name, fallbacks[name](content), timings) for name in missing))
+
+    enriched = {name: fused.get(name) for name in fallbacks}
+    enriched.update(zip(missing, results))
+    return enriched
+
+
+async def enrich_content(content: str, with_title: bool = True, mode: str = None) -> dict:
+    """
+    Run the AI enrichment for a piece of content.
+    Returns summary, tags, category (and optionally title) together with
+    a per-step timing breakdown in milliseconds and the helpers that fell
+    back to a placeholder ("fallbacks").
+
+    mode="parallel" runs the independent per-field calls concurrently;
+    mode="fused" asks for every field in a single JSON-schema response.
+    Defaults to the ENRICHMENT_MODE setting.
+    """
+    mode = mode or ENRICHMENT_MODE
+    timings = {}
+    fallbacks = []
+    started = time.perf_counter()
+    # gather() copies the context into each helper task, so they all append to this list
+    token = _enrichment_fallbacks.set(fallbacks)
+    try:
+        if mode == "fused":
+            enriched = await _enrich_fused(content, with_title, timings)
+        else:
+            steps = {
+                "summary": ai_generate_summary(content),
+                "tags": ai_generate_tags(content),
+                "category": ai_classify_category(content),
+            }
+            if with_title:
+                steps["title"] = ai_generate_title(content)
+            results = await asyncio.gather(*(_timed_step(name, coro, timings) for name, coro in steps.items()))
+            enriched = dict(zip(steps.keys(), results))
+    finally:
+        _enrichment_fallbacks.reset(token)
+
+    timings["enrichment_total"] = round((time.perf_counter() - started) * 1000, 2)
+    enriched["timings"] = timings
+    enriched["fallbacks"] = fallbacks
+    return enriched
+
+
+async def prepare_document(user_id: str, data_type: str, content, media_url: str = None, timings: dict = None):
+    """
+    Run the fetch / vision / enrichment stages for one item.
+    Returns the document to store (without its embedding) and the text to embed,
+    so callers can embed and insert many prepared items in bulk.
+    """
+    if data_type not in ["text", "url", "image"]:
+        raise HTTPException(status_code=400, detail="Invalid data type")
+    timings = {} if timings is None else timings
+
+    summary = ""
+    tags = []
+    category = []
+    title = ""
+    source_platform = ""
+    stored_content = ""
+
+    if data_type == "text":
+        stored_content = content
+        enriched = await enrich_content(content)
+        summary, tags, category, title = enriched["summary"], enriched["tags"], enriched["category"], enriched["title"]
+        timings.update(enriched["timings"])
+        source_platform = "Manual Entry"
+
+    elif data_type == "url":
+        title, url_content = await _timed_step("fetch_url", fetch_url_content(content), timings)
+        enrichment_cache = get_resources().enrichment_cache
+        enriched = await enrichment_cache.get(url_content) if enrichment_cache is not None else None
+        if enriched is None:
+            enriched = await enrich_content(url_content, with_title=False)
+            timings.update(enriched["timings"])
+            # Placeholders from a failed model call must not be served to other users
+            if enrichment_cache is not None and not enriched["fallbacks"]:
+                await enrichment_cache.set(url_content, enriched["summary"], enriched["tags"], enriched["category"])
+        summary, tags, category = enriched["summary"], enriched["tags"], enriched["category"]
+        stored_content = url_content
+        source_platform = extract_source_platform(content)
+        media_url = content
+    elif data_type == "image":
+        # The description feeds every other step, so it has to run first
+        image_bytes, mime_type = await _timed_step("preprocess_image", preprocess_image(content), timings)
+        summary = await _timed_step("describe_image", ai_describe_image(image_bytes, mime_type), timings)
+        enriched = await enrich_content(summary)
+        tags, category, title = enriched["tags"], enriched["category"], enriched["title"]
+        # Images store a summary of the description as their content
+        stored_content = enriched["summary"]
+        timings.update(enriched["timings"])
+        source_platform = "User Upload"
+
+    doc = {
+        "user_id": user_id,
+        "type": data_type,
+        "title": title,
+        "content": stored_content,
+        "summary": summary,
+        "tags": tags,
+        "category": category,
+        "source_platform": source_platform,
+        "media_url": media_url,
+        "created_at": datetime.now(timezone.utc)
+    }
+    return doc, build_embedding_text(title, summary, stored_content, tags, category)
+
+
+def attach_embedding(doc: dict, embedding_vector) -> dict:
+    """Store the embedding on a prepared document in the configured storage format, with the model that produced it."""
+    doc["embedding"] = encode_embedding(embedding_vector, EMBEDDING_STORAGE_FORMAT, EMBEDDING_DIMENSIONS)
+    # Vectors of different models are not comparable; search only matches the active model's
+    doc["embedding_model"] = EMBEDDING_MODEL
+    doc["embedding_dim"] = min(EMBEDDING_DIMENSIONS, len(embedding_vector)) if EMBEDDING_DIMENSIONS else len(embedding_vector)
+    return doc
+
+
+async def save_user_stuff(user_id: str, data_type: str, content:str=None, media_url: str = None, doc_id=None):
+    """
+    Save user-uploaded text, image, or URL intelligently into MongoDB.
+    `doc_id` (set by the ingest job queue) makes the insert idempotent across retries.
+    """
+    try:
+        timings = {}
+        doc, combined_text = await prepare_document(user_id, data_type, content, media_url, timings)
+
+        embedding_vector = await _timed_step("embedding", generate_embedding(combined_text), timings)
+        attach_embedding(doc, embedding_vector)
+        if doc_id is not None:
+            doc["_id"] = doc_id
+
+        try:
+            with span("mongo.insert_one", MONGO_DURATION, operation="insert_one"):
+                await _timed_step("insert", get_resources().data_col.insert_one(doc), timings)
+            get_resources().vector_indexes.add_document(user_id, doc)
+        except DuplicateKeyError:
+            if doc_id is None:
+                raise
+            # A previous attempt of this job already stored the document
+        if get_resources().search_cache is not None:
+            # Cached searches of this user no longer reflect their data
+            await get_resources().search_cache.bump(user_id)
+        return {"message": "Data saved successfully", "summary": doc["summary"], "tags": doc["tags"], "category": doc["category"], "timings": timings}
 
     except HTTPException as e:
         raise e
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import numpy as np
+from core.log import get_logger
+
+try:
+    import hnswlib
+except ImportError:  # optional dependency, only needed for VECTOR_ANN_BACKEND=hnsw
+    hnswlib = None
+
+logger = get_logger("synapse.search")
+
+
+def _index_path(directory: str, user_id: str, suffix: str) -> str:
+    digest = hashlib.sha1(str(user_id).encode("utf-8")).hexdigest()[:20]
+    return os.path.join(directory, f"{digest}.{suffix}")
+
+
+class IVFFlatIndex:
+    """
+    Inverted-file index over L2-normalized vectors, built with spherical k-means
+    in NumPy. A search scores only the vectors in the `nprobe` lists whose
+    centroids are closest to the query; higher nprobe means better recall.
+    """
+
+    name = "ivf"
+
+    def __init__(self, nprobe: int = 8):
+        self.nprobe = nprobe
+        self.centroids = None
+        self.lists = []
+
+    def build(self, matrix: np.ndarray, iterations: int = 10, seed: int = 0):
+        n = matrix.shape[0]
+        n_lists = max(1, min(4096, int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+        sample = matrix[rng.choice(n, size=min(n, n_lists * 256), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], size=n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[labels == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+        self.centroids = centroids.astype(np.float32)
+        self._assign_all(matrix)
+
+    def _assign_all(self, matrix: np.ndarray, chunk: int = 8192):
+        assignments = np.empty(matrix.shape[0], dtype=np.int32)
+        for start in range(0, matrix.shape[0], chunk):
+            assignments[start:start + chunk] = np.argmax(matrix[start:start + chunk] @ self.centroids.T, axis=1)
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+        self.lists = [list(order[bounds[c]:bounds[c + 1]]) for c in range(len(self.centroids))]
+
+    def add(self, row: int, vector: np.ndarray):
+        c = int(np.argmax(self.centroids @ vector))
+        self.lists[c].append(row)
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, allowed: np.ndarray, limit: int):
+        """Return (candidate_rows, scores) from the probed lists, restricted to `allowed` rows."""
+        centroid_order = np.argsort(-(self.centroids @ query))
+        nprobe = min(self.nprobe, len(centroid_order))
+        while True:
+            probed = [self.lists[c] for c in centroid_order[:nprobe]]
+            rows = np.concatenate([np.asarray(p, dtype=np.int64) for p in probed]) if probed else np.empty(0, dtype=np.int64)
+            if allowed is not None:
+                rows = rows[allowed[rows]]
+            # Widen the probe when the filter leaves too few candidates
+            if len(rows) >= limit or nprobe >= len(centroid_order):
+                break
+            nprobe = min(len(centroid_order), nprobe * 2)
+        return rows, matrix[rows] @ query
+
+    def save(self, directory: str, user_id: str, ids: list):
+        os.makedirs(directory, exist_ok=True)
+        path = _index_path(directory, user_id, "ivf.npz")
+        np.savez(path + ".tmp.npz", centroids=self.centroids, n_trained=np.int64(len(ids)))
+        os.replace(path + ".tmp.npz", path)
+
+    @classmethod
+    def load(cls, directory: str, user_id: str, matrix: np.ndarray, ids: list, nprobe: int = 8):
+        """Reuse persisted centroids; list assignment is a single matrix product."""
+        path = _index_path(directory, user_id, "ivf.npz")
+        if not os.path.exists(path):
+            return None
+        data = np.load(path)
+        centroids = data["centroids"]
+        # Retrain once the library has more than doubled since the centroids were learned
+        if centroids.shape[1] != matrix.shape[1] or matrix.shape[0] > 2 * int(data["n_trained"]):
+            return None
+        index = cls(nprobe)
+        index.centroids = centroids
+        index._assign_all(matrix)
+        return index
+
+
+class HNSWIndex:
+    """HNSW graph via the optional `hnswlib` package; `ef` is the recall/speed knob."""
+
+    name = "hnsw"
+
+    def __init__(self, ef: int = 64, m: int = 16, ef_construction: int = 200):
+        self.ef = ef
+        self.m = m
+        self.ef_construction = ef_construction
+        self.graph = None
+        self.labels_to_rows = []
+        self.deleted_labels = set()
+
+    def build(self, matrix: np.ndarray):
+        n, dim = matrix.shape
+        self.graph = hnswlib.Index(space="ip", dim=dim)
+        self.graph.init_index(max_elements=max(n * 2, 1024), M=self.m, ef_construction=self.ef_construction)
+        self.graph.add_items(matrix, np.arange(n))
+        self.labels_to_rows = list(range(n))
+
+    def add(self, row: int, vector: np.ndarray):
+        if self.graph.get_current_count() >= self.graph.get_max_elements():
+            self.graph.resize_index(self.graph.get_max_elements() * 2)
+        self.graph.add_items(vector.reshape(1, -1), np.array([len(self.labels_to_rows)]))
+        self.labels_to_rows.append(row)
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, allowed: np.ndarray, limit: int):
+        k = min(max(limit, 1), len(self.labels_to_rows))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        self.graph.set_ef(max(self.ef, k))
+        label_filter = None
+        if allowed is not None:
+            k = min(k, int(allowed.sum()))
+            if k == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            label_filter = lambda label: bool(allowed[self.labels_to_rows[label]])
+        labels, _ = self.graph.knn_query(query.reshape(1, -1), k=k, filter=label_filter)
+        rows = np.asarray([self.labels_to_rows[label] for label in labels[0]], dtype=np.int64)
+        return rows, matrix[rows] @ query
+
+    def save(self, directory: str, user_id: str, ids: list):
+        os.makedirs(directory, exist_ok=True)
+        path = _index_path(directory, user_id, "hnsw")
+        self.graph.save_index(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        label_ids = np.asarray([
+            "" if label in self.deleted_labels else str(ids[row])
+            for label, row in enumerate(self.labels_to_rows)
+        ])
+        np.save(path + ".ids.tmp.npy", label_ids)
+        os.replace(path + ".ids.tmp.npy", path + ".ids.npy")
+
+    @classmethod
+    def load(cls, directory: str, user_id: str, matrix: np.ndarray, ids: list, ef: int = 64):
+        """Load the saved graph and map its labels back onto the freshly loaded rows."""
+        path = _index_path(directory, user_id, "hnsw")
+        if not os.path.exists(path) or not os.path.exists(path + ".ids.npy"):
+            return None
+        label_ids = np.load(path + ".ids.npy")
+        index = cls(ef)
+        index.graph = hnswlib.Index(space="ip", dim=matrix.shape[1])
+        index.graph.load_index(path, max_elements=max(len(label_ids) * 2, 1024))
+
+        row_by_id = {str(doc_id): row for row, doc_id in enumerate(ids)}
+        index.labels_to_rows = []
+        for label, doc_id in enumerate(label_ids):
+            row = row_by_id.pop(str(doc_id), None)
+            if row is None:
+                # Document deleted since the graph was saved
+                index.graph.mark_deleted(label)
+                index.deleted_labels.add(label)
+                row = 0
+            index.labels_to_rows.append(row)
+        for row in row_by_id.values():
+            index.add(row, matrix[row])
+        return index
+
+
+def create_ann_index(backend: str, nprobe: int = 8, ef: int = 64):
+    if backend == "hnsw":
+        if hnswlib is not None:
+            return HNSWIndex(ef)
+        logger.warning("hnswlib_unavailable", extra={"fallback": "ivf_flat"})
+    return IVFFlatIndex(nprobe)
+
+
+def load_ann_index(backend: str, directory: str, user_id: str, matrix: np.ndarray, ids: list, nprobe: int = 8, ef: int = 64):
+    try:
+        if backend == "hnsw" and hnswlib is not None:
+            return HNSWIndex.load(directory, user_id, matrix, ids, ef)
+        return IVFFlatIndex.load(directory, user_id, matrix, ids, nprobe)
+    except Exception as e:
+        logger.warning("ann_index_load_failed", extra={"user_id": user_id, "error": str(e)})
+        return None
@@ -0,0 +1,230 @@
+import asyncio
+import base64
+import binascii
+import json
+import os
+import time
+import zipfile
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError
+from core.add_data import prepare_document, attach_embedding, generate_embeddings
+from core.metrics import MONGO_DURATION
+from core.rate_limiter import ai_priority
+from core.resources import get_resources
+from core.tracing import span
+
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+URL_EXTENSIONS = {".url", ".webloc"}
+BATCH_MAX_WAIT_SECONDS = 2
+# Largest single file accepted inside an archive
+MAX_MEMBER_BYTES = 20 * 1024 * 1024
+
+
+def parse_item(obj) -> dict:
+    """
+    Validate one import record. Accepts the same fields as POST /add:
+    {"data_type": "text", "text": ...}, {"data_type": "url", "url": ...} or
+    {"data_type": "image", "image_base64": ...}, plus an optional client "id".
+    """
+    if not isinstance(obj, dict):
+        raise ValueError("Each line must be a JSON object")
+    data_type = obj.get("data_type") or obj.get("type")
+    if data_type == "text" and isinstance(obj.get("text"), str) and obj["text"].strip():
+        content = obj["text"]
+    elif data_type == "url" and isinstance(obj.get("url"), str) and obj["url"].strip():
+        content = obj["url"].strip()
+    elif data_type == "image" and isinstance(obj.get("image_base64"), str):
+        try:
+            content = base64.b64decode(obj["image_base64"], validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("image_base64 is not valid base64")
+    else:
+        raise ValueError("Invalid input for the selected data type.")
+    return {"id": obj.get("id"), "data_type": data_type, "content": content}
+
+
+def iter_jsonl(fileobj):
+    """Yield (item | error message) per non-empty line, reading the file lazily."""
+    for raw in fileobj:
+        line = raw.strip()
+        if not line:
+            continue
+        try:
+            yield parse_item(json.loads(line))
+        except (ValueError, json.JSONDecodeError) as e:
+            yield {"error": str(e)}
+
+
+def _url_from_shortcut(name: str, data: bytes) -> str:
+    text = data.decode("utf-8", errors="ignore")
+    if name.endswith(".webloc"):
+        # Property list: <key>URL</key><string>https://...</string>
+        start = text.find("<string>")
+        end = text.find("</string>", start)
+        return text[start + len("<string>"):end].strip() if start != -1 and end != -1 else ""
+    for line in text.splitlines():
+        if line.strip().upper().startswith("URL="):
+            return line.strip()[4:]
+    return ""
+
+
+def iter_archive(fileobj, max_member_bytes: int):
+    """
+    Yield items from a zip archive: .txt/.md files become text, images become
+    image items, .url/.webloc shortcuts become url items and .jsonl files are
+    read line by line. Members are decompressed one at a time.
+    """
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or os.path.basename(name).startswith(".") or "__MACOSX" in name:
+                continue
+            ext = os.path.splitext(name)[1].lower()
+            if ext == ".jsonl":
+                with archive.open(info) as member:
+                    for item in iter_jsonl(line.decode("utf-8", errors="replace") for line in member):
+                        yield item
+                continue
+            if ext not in TEXT_EXTENSIONS | IMAGE_EXTENSIONS | URL_EXTENSIONS:
+                yield {"id": name, "error": "Unsupported file type"}
+                continue
+            if info.file_size > max_member_bytes:
+                yield {"id": name, "error": "File too large"}
+                continue
+            data = archive.read(info)
+            if ext in IMAGE_EXTENSIONS:
+                yield {"id": name, "data_type": "image", "content": data}
+            elif ext in URL_EXTENSIONS:
+                url = _url_from_shortcut(name, data)
+                yield {"id": name, "data_type": "url", "content": url} if url else {"id": name, "error": "No URL in shortcut"}
+            else:
+                text = data.decode("utf-8", errors="replace")
+                yield {"id": name, "data_type": "text", "content": text} if text.strip() else {"id": name, "error": "Empty file"}
+
+
+async def _insert_batch(user_id: str, batch: list) -> list[dict]:
+    """Embed a batch of prepared documents in bulk and store them with one insert_many."""
+    results = []
+    embeddings = await generate_embeddings([text for _, _, _, text in batch])
+    docs, refs = [], []
+    for (index, ref, doc, _), embedding in zip(batch, embeddings):
+        if not embedding:
+            results.append({"index": index, "id": ref, "status": "error", "error": "Embedding failed"})
+            continue
+        docs.append(attach_embedding(doc, embedding))
+        refs.append((index, ref))
+    if not docs:
+        return results
+
+    failed = {}
+    try:
+        with span("mongo.insert_many", MONGO_DURATION, operation="insert_many"):
+            await get_resources().data_col.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        failed = {err["index"]: err.get("errmsg", "Insert failed") for err in e.details.get("writeErrors", [])}
+
+    if len(failed) < len(docs) and get_resources().search_cache is not None:
+        await get_resources().search_cache.bump(user_id)
+    vector_indexes = get_resources().vector_indexes
+    for position, ((index, ref), doc) in enumerate(zip(refs, docs)):
+        if position in failed:
+            results.append({"index": index, "id": ref, "status": "error", "error": failed[position]})
+            continue
+        vector_indexes.add_document(user_id, doc)
+        results.append({"index": index, "id": ref, "status": "ok", "title": doc["title"], "tags": doc["tags"], "category": doc["category"]})
+    return results
+
+
+async def import_items(user_id: str, items, concurrency: int = 16, batch_size: int = 100, max_items: int = 10000):
+    """
+    Import an iterator of parsed items and yield one result per item as soon as
+    it is known, followed by a summary. Fetching / enrichment runs for up to
+    `concurrency` items at a time while earlier items are embedded and inserted
+    in batches of `batch_size`, so slow pages do not stall the rest.
+    The iterator is consumed lazily (in a thread), so large inputs are never
+    held in memory at once.
+    """
+    started = time.perf_counter()
+    # Bounded, so enrichment pauses instead of piling up prepared documents while a batch is inserted
+    ready = asyncio.Queue(maxsize=batch_size + concurrency)
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+    done_marker = object()
+
+    async def prepare(index: int, item: dict):
+        try:
+            doc, text = await prepare_document(user_id, item["data_type"], item["content"])
+            await ready.put((index, item.get("id"), doc, text))
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            await ready.put({"index": index, "id": item.get("id"), "status": "error", "error": detail})
+        finally:
+            slots.release()
+
+    async def produce():
+        iterator = iter(items)
+        index = 0
+        try:
+            while True:
+                item = await asyncio.to_thread(next, iterator, None)
+                if item is None:
+                    break
+                if index >= max_items:
+                    await ready.put({"index": index, "id": item.get("id"), "status": "error", "error": f"Import is limited to {max_items} items"})
+                    break
+                if "error" in item:
+                    await ready.put({"index": index, "id": item.get("id"), "status": "error", "error": item["error"]})
+                else:
+                    await slots.acquire()
+                    task = asyncio.create_task(prepare(index, item))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                index += 1
+        except Exception as e:
+            # Broken archive / stream: report it and finish what was already read
+            await ready.put({"index": index, "id": None, "status": "error", "error": f"Could not read input: {e}"})
+        if tasks:
+            await asyncio.gather(*tasks)
+        await ready.put(done_marker)
+
+    # Imports must not crowd out interactive searches and single adds on the shared OpenAI quota
+    with ai_priority("background"):
+        producer = asyncio.create_task(produce())
+    saved = failed = 0
+    batch = []
+    try:
+        while True:
+            try:
+                # A partly filled batch is flushed once the input stalls, so results keep streaming
+                entry = await asyncio.wait_for(ready.get(), BATCH_MAX_WAIT_SECONDS if batch else None)
+            except asyncio.TimeoutError:
+                entry = None
+            if isinstance(entry, dict):
+                failed += 1
+                yield entry
+                continue
+            if entry is not None and entry is not done_marker:
+                batch.append(entry)
+                if len(batch) < batch_size:
+                    continue
+            if batch:
+                with ai_priority("background"):
+                    try:
+                        results = await _insert_batch(user_id, batch)
+                    except Exception as e:
+                        results = [{"index": index, "id": ref, "status": "error", "error": str(e)} for index, ref, _, _ in batch]
+                batch = []
+                for result in results:
+                    saved += result["status"] == "ok"
+                    failed += result["status"] != "ok"
+                    yield result
+            if entry is done_marker:
+                break
+    finally:
+        # Client went away: stop reading and cancel in-flight enrichment
+        producer.cancel()
+        for task in list(tasks):
+            task.cancel()
+
+    yield {"summary": {"saved": saved, "failed": failed, "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}}
@@ -1,36 +1,79 @@
-from utils.config import load_environments,get_JWT_settings
-from motor.motor_asyncio import AsyncIOMotorClient
+from utils.config import get_JWT_settings,get_password_hash_settings
+from core.resources import get_resources
 from fastapi import HTTPException
 from datetime import datetime,timedelta,timezone
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from jose import jwt 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-mongodb_URL,mongodb,collection,collection2,OPENAI_API_KEY=load_environments()
+import asyncio
+import time
+BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS = get_password_hash_settings()
+# Pinning min/max to the configured cost makes verify_and_update flag hashes made with any other cost
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS
+)
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+_hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_slots = None
+hash_stats = {"queued": 0, "in_flight": 0, "completed": 0, "rehashed": 0, "total_ms": 0.0}
 ALGORITHM, SECRET_KEY, ACCESS_TOKEN_EXPIRE_MINUTES = get_JWT_settings()
-client=AsyncIOMotorClient(mongodb_URL)
-database=client[mongodb]
-collection=database[collection]
+
+
+async def _run_hash_job(fn, *args):
+    """
+    Run a bcrypt operation in the hash pool. At most PASSWORD_HASH_WORKERS jobs
+    run at once; the rest wait here (counted in hash_stats["queued"]).
+    """
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+    hash_stats["queued"] += 1
+    async with _hash_slots:
+        hash_stats["queued"] -= 1
+        hash_stats["in_flight"] += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+        finally:
+            hash_stats["in_flight"] -= 1
+            hash_stats["completed"] += 1
+            hash_stats["total_ms"] += (time.perf_counter() - started) * 1000
+
+
+def get_hash_stats() -> dict:
+    completed = hash_stats["completed"]
+    return {**hash_stats, "avg_ms": round(hash_stats["total_ms"] / completed, 2) if completed else 0.0}
 
 
 async def register_user(name: str, email: str, password: str):
-    existing = await collection.find_one({"email": email})
+    users_col = get_resources().users_col
+    existing = await users_col.find_one({"email": email})
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_pw = pwd_context.hash(password)
+    hashed_pw = await _run_hash_job(pwd_context.hash, password)
     new_user = {
         "name": name,
         "email": email,
         "password_hash": hashed_pw,
         "created_at": datetime.now(timezone.utc)
     }
-    await collection.insert_one(new_user)
+    await users_col.insert_one(new_user)
 
     return {"message": "User registered successfully"}
 
 async def login_user(email: str, password: str):
-    user = await collection.find_one({"email": email})
-    if not user or not pwd_context.verify(password, user.get("password_hash", "")):
+    users_col = get_resources().users_col
+    user = await users_col.find_one({"email": email})
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await _run_hash_job(pwd_context.verify_and_update, password, user.get("password_hash", ""))
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # Stored hash used an older cost factor; upgrade it transparently
+        await users_col.update_one({"_id": user["_id"]}, {"$set": {"password_hash": new_hash}})
+        hash_stats["rehashed"] += 1
 
     # Safety check
     if "email" not in user:
@@ -0,0 +1,121 @@
+import asyncio
+from core.rate_limiter import AI_PRIORITIES, ai_priority, current_ai_priority, estimate_tokens, classify_ai_error
+from core.log import get_logger
+
+logger = get_logger("synapse.embeddings")
+
+
+def clamp_text(text: str, max_tokens: int = None) -> str:
+    """Cut a text to at most about `max_tokens` estimated tokens, so an over-long note cannot fail its request."""
+    if not max_tokens or estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:max_tokens * 3]
+
+
+def split_batches(texts: list[str], max_batch_size: int, max_batch_tokens: int) -> list[list[int]]:
+    """
+    Group text indices into request-sized batches that stay under both
+    the per-request input count and the per-request token budget.
+    """
+    batches, current, current_tokens = [], [], 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= max_batch_size or current_tokens + tokens > max_batch_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def embed_isolated(embed_fn, texts: list[str], stats: dict = None) -> list:
+    """
+    Call embed_fn on a batch; returns one embedding or Exception per text.
+    When the batch fails with a non-retryable error (e.g. one invalid input),
+    it is bisected so only the offending inputs fail. Retryable errors are
+    left over after the rate limiter's own retries and affect every input alike.
+    """
+    try:
+        if stats is not None:
+            stats["api_calls"] += 1
+        return list(await embed_fn(texts))
+    except Exception as e:
+        if len(texts) == 1 or classify_ai_error(e)[0]:
+            return [e] * len(texts)
+        if stats is not None:
+            stats["bisections"] += 1
+        logger.warning("embedding_batch_failed", extra={"inputs": len(texts), "error": str(e), "retry": "bisect"})
+        middle = len(texts) // 2
+        left, right = await asyncio.gather(embed_isolated(embed_fn, texts[:middle], stats),
+                                           embed_isolated(embed_fn, texts[middle:], stats))
+        return left + right
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding requests into one API call.
+    Requests arriving within `max_wait_ms` of each other (or until
+    `max_batch_size` is reached) are sent together.
+    """
+
+    def __init__(self, embed_fn, max_batch_size: int = 64, max_wait_ms: float = 10, max_batch_tokens: int = 250000):
+        # embed_fn: async callable taking list[str] and returning list[list[float]] in order
+        self._embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_tokens = max_batch_tokens
+        self._pending = []
+        self._flush_handle = None
+        self._loop = None
+        self.stats = {"requests": 0, "api_calls": 0, "texts_embedded": 0, "bisections": 0}
+
+    async def embed(self, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A new event loop (e.g. a CLI run) must not inherit futures from the old one
+            self._loop, self._pending, self._flush_handle = loop, [], None
+
+        future = loop.create_future()
+        # Remember who asked, so a batch carrying a search query is sent at search priority
+        self._pending.append((text, future, current_ai_priority()))
+        self.stats["requests"] += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush(0)
+        elif self._flush_handle is None:
+            self._schedule_flush(self.max_wait)
+        return await future
+
+    def _schedule_flush(self, delay: float):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = self._loop.call_later(delay, lambda: asyncio.ensure_future(self._flush()))
+
+    async def _flush(self):
+        pending, self._pending, self._flush_handle = self._pending, [], None
+        if not pending:
+            return
+        texts = [text for text, _, _ in pending]
+        await asyncio.gather(*(
+            self._run_batch([pending[i] for i in batch])
+            for batch in split_batches(texts, self.max_batch_size, self.max_batch_tokens)
+        ))
+
+    async def _run_batch(self, batch):
+        priority = min((p for _, _, p in batch), key=lambda p: AI_PRIORITIES.get(p, 1))
+        with ai_priority(priority):
+            # One bad input fails only its own caller, not the unrelated requests coalesced with it
+            results = await embed_isolated(self._embed_fn, [text for text, _, _ in batch], self.stats)
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                self.stats["texts_embedded"] += 1
+                future.set_result(result)
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "pending": len(self._pending)}
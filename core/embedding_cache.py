@@ -0,0 +1,133 @@
+import hashlib
+import re
+import unicodedata
+from datetime import datetime, timezone
+from cachetools import LRUCache
+from pymongo import UpdateOne
+from core.log import get_logger
+
+logger = get_logger("synapse.cache")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different inputs share one cache entry."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_cache_key(model: str, text: str) -> str:
+    """Hash of (model, normalized text), used as the cache key and Mongo _id."""
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: a bounded in-process LRU in front of a
+    MongoDB collection whose entries expire through a TTL index on
+    created_at (maintained by core/indexes.py).
+    """
+
+    def __init__(self, collection=None, max_entries: int = 10000):
+        self._memory = LRUCache(maxsize=max_entries)
+        self._collection = collection
+        self.stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    async def get(self, model: str, text: str):
+        key = make_cache_key(model, text)
+        embedding = self._memory.get(key)
+        if embedding is not None:
+            self.stats["memory_hits"] += 1
+            return embedding
+
+        if self._collection is not None:
+            try:
+                doc = await self._collection.find_one({"_id": key}, {"embedding": 1})
+            except Exception as e:
+                logger.warning("cache_lookup_failed", extra={"collection": "embedding_cache", "error": str(e)})
+                self.stats["errors"] += 1
+                doc = None
+            if doc and doc.get("embedding"):
+                self.stats["persistent_hits"] += 1
+                self._memory[key] = doc["embedding"]
+                return doc["embedding"]
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, model: str, text: str, embedding: list[float]):
+        if not embedding:
+            return
+        key = make_cache_key(model, text)
+        self._memory[key] = embedding
+        if self._collection is None:
+            return
+        try:
+            await self._collection.update_one(
+                {"_id": key},
+                {"$set": {"model": model, "embedding": embedding, "created_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+            self.stats["writes"] += 1
+        except Exception as e:
+            # The cache is best-effort: a failed write must never fail the request
+            logger.warning("cache_write_failed", extra={"collection": "embedding_cache", "error": str(e)})
+            self.stats["errors"] += 1
+
+    async def get_many(self, model: str, texts: list[str]) -> list:
+        """Bulk lookup; returns one embedding (or None) per text, in order."""
+        keys = [make_cache_key(model, text) for text in texts]
+        found = {}
+        for key in keys:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                found[key] = embedding
+                self.stats["memory_hits"] += 1
+
+        remote_keys = list({key for key in keys if key not in found})
+        if remote_keys and self._collection is not None:
+            try:
+                cursor = self._collection.find({"_id": {"$in": remote_keys}}, {"embedding": 1})
+                async for doc in cursor:
+                    if doc.get("embedding"):
+                        found[doc["_id"]] = doc["embedding"]
+                        self._memory[doc["_id"]] = doc["embedding"]
+                        self.stats["persistent_hits"] += 1
+            except Exception as e:
+                logger.warning("cache_lookup_failed", extra={"collection": "embedding_cache", "error": str(e)})
+                self.stats["errors"] += 1
+
+        results = [found.get(key) for key in keys]
+        self.stats["misses"] += results.count(None)
+        return results
+
+    async def set_many(self, model: str, texts: list[str], embeddings: list) -> None:
+        now = datetime.now(timezone.utc)
+        operations = []
+        for text, embedding in zip(texts, embeddings):
+            if not embedding:
+                continue
+            key = make_cache_key(model, text)
+            self._memory[key] = embedding
+            operations.append(UpdateOne(
+                {"_id": key},
+                {"$set": {"model": model, "embedding": embedding, "created_at": now}},
+                upsert=True
+            ))
+        if not operations or self._collection is None:
+            return
+        try:
+            await self._collection.bulk_write(operations, ordered=False)
+            self.stats["writes"] += len(operations)
+        except Exception as e:
+            logger.warning("cache_write_failed", extra={"collection": "embedding_cache", "error": str(e)})
+            self.stats["errors"] += 1
+
+    def get_stats(self) -> dict:
+        hits = self.stats["memory_hits"] + self.stats["persistent_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
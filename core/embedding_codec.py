@@ -0,0 +1,75 @@
+import numpy as np
+from bson.binary import Binary
+
+# BSON binary vector subtype (also understood by Atlas $vectorSearch)
+VECTOR_SUBTYPE = 9
+# First header byte of a subtype-9 payload identifies the element type
+_DTYPE_HEADERS = {"int8": b"\x03", "float32": b"\x27"}
+_HEADER_DTYPES = {0x03: np.int8, 0x27: np.dtype("<f4")}
+
+STORAGE_FORMATS = ("array", "float32", "int8")
+
+
+def truncate_embedding(vector, dimensions: int = None) -> np.ndarray:
+    """
+    Matryoshka truncation: keep the first `dimensions` components and
+    re-normalize. text-embedding-3 models are trained so that prefixes
+    remain good embeddings.
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    if dimensions and 0 < dimensions < vector.shape[0]:
+        vector = vector[:dimensions]
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+    return vector
+
+
+def encode_embedding(vector, storage_format: str = "array", dimensions: int = None):
+    """
+    Convert a model embedding into its stored form:
+    - "array":   BSON array of doubles (the original format)
+    - "float32": BSON binary vector, 4 bytes per dimension
+    - "int8":    BSON binary vector, 1 byte per dimension. Each vector is scaled
+                 by its own max |x|, which cosine similarity ignores.
+    """
+    if vector is None or len(vector) == 0:
+        return []
+    if storage_format == "array" and not dimensions and isinstance(vector, list):
+        return vector
+    vector = truncate_embedding(vector, dimensions)
+
+    if storage_format == "float32":
+        return Binary(_DTYPE_HEADERS["float32"] + b"\x00" + vector.astype("<f4").tobytes(), VECTOR_SUBTYPE)
+    if storage_format == "int8":
+        peak = float(np.max(np.abs(vector))) or 1.0
+        quantized = np.clip(np.rint(vector * (127.0 / peak)), -127, 127).astype(np.int8)
+        return Binary(_DTYPE_HEADERS["int8"] + b"\x00" + quantized.tobytes(), VECTOR_SUBTYPE)
+    return vector.astype(np.float64).tolist()
+
+
+def decode_embedding(value) -> np.ndarray:
+    """
+    Turn a stored embedding back into a NumPy vector. Binary vectors are
+    decoded zero-copy with np.frombuffer, so the result is read-only.
+    """
+    if value is None:
+        return np.empty(0, dtype=np.float32)
+    if isinstance(value, Binary) and value.subtype == VECTOR_SUBTYPE:
+        dtype = _HEADER_DTYPES.get(value[0])
+        if dtype is None:
+            raise ValueError(f"Unsupported binary vector dtype 0x{value[0]:02x}")
+        return np.frombuffer(value, dtype=dtype, offset=2)
+    if isinstance(value, np.ndarray):
+        return value
+    return np.asarray(value, dtype=np.float32)
+
+
+def embedding_nbytes(storage_format: str, dimensions: int) -> int:
+    """Approximate stored size of one embedding, for reporting."""
+    if storage_format == "float32":
+        return 2 + 4 * dimensions
+    if storage_format == "int8":
+        return 2 + dimensions
+    # BSON array: type byte + index key + 8-byte double per element
+    return sum(1 + len(str(i)) + 1 + 8 for i in range(dimensions))
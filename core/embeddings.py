@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from utils.config import get_embedding_settings, get_embedding_provider_settings
+
+# Output size of each OpenAI embedding model when no Matryoshka truncation is configured
+MODEL_DIMENSIONS = {"text-embedding-3-large": 3072, "text-embedding-3-small": 1536, "text-embedding-ada-002": 1536}
+# Input limit of the OpenAI embedding models; longer inputs fail the whole request
+OPENAI_MAX_INPUT_TOKENS = 8191
+
+
+class OpenAIEmbeddingProvider:
+    """Embeddings API; one request per batch, through the shared rate limiter."""
+
+    name = "openai"
+    max_input_tokens = OPENAI_MAX_INPUT_TOKENS
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @property
+    def dimensions(self) -> int:
+        return MODEL_DIMENSIONS.get(self.model, 3072)
+
+    def load(self):
+        pass
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        from core.resources import get_resources
+        response = await get_resources().ai_client.embeddings.create(model=self.model, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+class LocalEmbeddingProvider:
+    """
+    sentence-transformers model (MiniLM, BGE, E5, ...; optionally its ONNX or
+    OpenVINO export) running on this machine. The model is loaded on first use
+    and batches are encoded in a small thread pool, so the event loop stays free
+    and up to `threads` batches run at once.
+    """
+
+    name = "local"
+    # sentence-transformers truncates to the model's max_seq_length itself
+    max_input_tokens = None
+
+    def __init__(self, model: str, threads: int = 2, batch_size: int = 32, device: str = "cpu", backend: str = "torch"):
+        self.model = model
+        self.batch_size = batch_size
+        self.device = device
+        self.backend = backend
+        self._model = None
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="embedding")
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError:
+                    raise RuntimeError("EMBEDDING_PROVIDER=local needs sentence-transformers (pip install sentence-transformers)")
+                # Older sentence-transformers releases only know the torch backend and reject the argument
+                options = {"backend": self.backend} if self.backend != "torch" else {}
+                self._model = SentenceTransformer(self.model, device=self.device, **options)
+        return self._model
+
+    @property
+    def dimensions(self) -> int:
+        return self.load().get_sentence_embedding_dimension()
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        vectors = self.load().encode(texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32).tolist()
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.get_running_loop().run_in_executor(self._pool, self._encode, texts)
+
+
+_provider = None
+
+
+def get_embedding_provider():
+    """The process-wide provider selected by EMBEDDING_PROVIDER."""
+    global _provider
+    if _provider is None:
+        provider, local_model, local_threads, local_batch_size, local_device, local_backend = get_embedding_provider_settings()
+        if provider == "local":
+            _provider = LocalEmbeddingProvider(local_model, local_threads, local_batch_size, local_device, local_backend)
+        else:
+            _provider = OpenAIEmbeddingProvider(get_embedding_settings()[0])
+    return _provider
+
+
+def embedding_model_filter() -> dict:
+    """
+    MongoDB filter for documents whose vectors are comparable with the active
+    model. Documents saved before the model was recorded per document were all
+    embedded with the configured OpenAI model; backfill_embedding_model gives
+    them the field, the null match only covers collections not yet backfilled.
+    Atlas $vectorSearch filters match the model exactly instead.
+    """
+    model = get_embedding_provider().model
+    if model == get_embedding_settings()[0]:
+        return {"embedding_model": {"$in": [model, None]}}
+    return {"embedding_model": model}
+
+
+async def backfill_embedding_model(collection, user_id: str = None) -> int:
+    """Record the configured OpenAI model on documents stored before embedding_model existed. Returns the number updated."""
+    query = {"embedding_model": {"$exists": False}, "embedding": {"$exists": True}}
+    if user_id:
+        query["user_id"] = user_id
+    result = await collection.update_many(query, {"$set": {"embedding_model": get_embedding_settings()[0]}})
+    return result.modified_count
@@ -1,17 +1,31 @@
-import os, requests, json, numpy as np # Make sure numpy is imported
-from datetime import datetime, timezone
+import re
+import time
+import asyncio
+from cachetools import LRUCache
 from fastapi import HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
-from openai import AsyncOpenAI
-from utils.config import load_environments
-from bs4 import BeautifulSoup
+from utils.config import get_embedding_storage_settings, get_query_classifier_settings
+from core.resources import get_resources
+from core.vector_index import top_k, METADATA_FIELDS
+from core.embedding_codec import truncate_embedding
+from core.embedding_cache import normalize_text
+from core.embeddings import embedding_model_filter, get_embedding_provider
+from core.indexes import vector_index_filter_paths
+from core.search_cache import SearchResultCache
+from core.add_data import generate_embedding
+from core.metrics import LLM_DURATION, MONGO_DURATION, LOCAL_SEARCH_DURATION, SEARCH_PATH, AI_FALLBACKS
+from core.tracing import span
+from core.log import get_logger
 
 # --- ENVIRONMENT CONFIG ---
-mongodb_URL, mongodb, collection, collection2, OPENAI_API_KEY = load_environments()
-ai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-client = AsyncIOMotorClient(mongodb_URL)
-db = client[mongodb]
-data_col = db["data"]
+EMBEDDING_STORAGE_FORMAT, EMBEDDING_DIMENSIONS = get_embedding_storage_settings()
+QUERY_CLASSIFIER_MODE, QUERY_TYPE_MIN_CONFIDENCE, query_type_cache_size = get_query_classifier_settings()
+# Memoized query types, keyed by normalized query
+_query_type_cache = LRUCache(maxsize=query_type_cache_size)
+query_type_stats = {"memo_hits": 0, "rules": 0, "llm": 0}
+# Filter fields of the live Atlas vector_index, re-read every few minutes to notice a finished rebuild
+VECTOR_FILTER_RECHECK_SECONDS = 300
+_vector_filters = {"paths": set(), "checked_at": None}
+logger = get_logger("synapse.search")
 
 # --- 1️⃣ CLASSIFY USER QUERY TYPE ---
 async def classify_query_type(query: str) -> str:
@@ -30,73 +44,141 @@ async def classify_query_type(query: str) -> str:
 3.  If uncertain, always default to `all`.
 **Query:** "{query}"
 """
-        res = await ai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=5
-        )
+        with span("llm.classify_query", LLM_DURATION, helper="classify_query"):
+            res = await get_resources().ai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=5
+            )
         qtype = res.choices[0].message.content.strip().lower()
         if qtype not in ["text", "image", "url", "all"]:
             qtype = "all"
         return qtype
-    except Exception:
+    except Exception as e:
+        AI_FALLBACKS.inc(helper="classify_query", fallback="all")
+        logger.warning("ai_fallback", extra={"helper": "classify_query", "fallback": "all", "error": str(e)})
         return "all"
 
+# Phrasing that names the data type the user wants back ("photo of", "article I saved", "my notes on")
+_SAVED = r"(?:i|that i|we) (?:saved|took|read|watched|bookmarked|shared|uploaded|wrote|jotted|made)"
+QUERY_TYPE_PATTERNS = {
+    "image": re.compile(r"\b(?:photos?|pictures?|pics?|screenshots?|images?|selfies?|snapshots?) (?:of|from|with|showing)\b"
+                        r"|\b(?:photos?|pictures?|pics?|screenshots?|images?|selfies?) " + _SAVED + r"\b"
+                        r"|\bmy (?:photos|pictures|pics|screenshots|images|selfies)\b|\.(?:jpe?g|png)\b"),
+    "url": re.compile(r"\b(?:articles?|links?|websites?|sites?|blog posts?|posts?|webpages?|videos?|bookmarks?|urls?) " + _SAVED + r"\b"
+                      r"|\b(?:articles?|blog posts?|webpages?|youtube videos?) (?:on|about)\b"
+                      r"|\bmy (?:bookmarks|saved links|saved articles)\b|\bhttps?\b|\bwww\b"),
+    "text": re.compile(r"\bmy (?:notes?|memos?|journal|thoughts?|snippets?) (?:on|about|from)\b"
+                       r"|\b(?:notes?|memos?|thoughts?|snippets?) " + _SAVED + r"\b|\bwhat i (?:wrote|jotted)\b"),
+    # No filter, so these can never cost recall
+    "all": re.compile(r"\b(?:everything|anything|stuff)\b"),
+}
+# Bare nouns that only hint at a type: "image processing", "link between diet and sleep"
+# and "video game design" are topics, not type filters, so these are left to the LLM
+QUERY_TYPE_KEYWORDS = {
+    "image": {"photo", "photos", "picture", "pictures", "pic", "pics", "image", "images", "screenshot",
+              "screenshots", "selfie", "selfies", "snapshot", "jpg", "jpeg", "png"},
+    "url": {"article", "articles", "link", "links", "website", "websites", "site", "url", "urls", "blog",
+            "webpage", "youtube", "video", "videos", "medium", "bookmark", "bookmarks"},
+    "text": {"note", "notes", "memo", "memos", "jotted", "wrote", "journal", "snippet", "snippets", "thought", "thoughts"},
+}
+
+
+def classify_query_type_fast(query: str) -> tuple[str, float]:
+    """
+    Local rule classifier. Returns (query_type, confidence): explicit type
+    phrasing for a single type is confident, a bare type noun is only a hint
+    and no match or a mix of types is not.
+    """
+    text = " ".join(re.findall(r"[a-z0-9.]+", query.lower()))
+    phrased = [qtype for qtype, pattern in QUERY_TYPE_PATTERNS.items() if pattern.search(text)]
+    if len(phrased) == 1:
+        return phrased[0], 0.9
+    if len(phrased) > 1:
+        return "all", 0.6
+    words = set(re.findall(r"[a-z0-9]+", text))
+    matched = [qtype for qtype, keywords in QUERY_TYPE_KEYWORDS.items() if words & keywords]
+    if len(matched) == 1:
+        return matched[0], 0.5
+    return "all", 0.3
+
+
+async def resolve_query_type(query: str) -> str:
+    """
+    Query type for the search hot path: memoized per normalized query,
+    answered by the keyword rules when they are confident, and by the
+    LLM classifier only for the remaining ambiguous queries.
+    """
+    key = normalize_text(query).lower()
+    cached = _query_type_cache.get(key)
+    if cached is not None:
+        query_type_stats["memo_hits"] += 1
+        return cached
+
+    qtype, confidence = classify_query_type_fast(key)
+    if QUERY_CLASSIFIER_MODE == "llm" or (QUERY_CLASSIFIER_MODE == "hybrid" and confidence < QUERY_TYPE_MIN_CONFIDENCE):
+        qtype = await classify_query_type(query)
+        query_type_stats["llm"] += 1
+    else:
+        if confidence < QUERY_TYPE_MIN_CONFIDENCE:
+            # Rules only: a type filter on a mere hint would drop matching items of other types
+            qtype = "all"
+        query_type_stats["rules"] += 1
+
+    _query_type_cache[key] = qtype
+    return qtype
+
 # --- 2️⃣ ADD THIS HELPER FUNCTION (THE FALLBACK) ---
 async def _local_cosine_search(user_id: str, query_vector: list, mongo_filter: dict, limit: int = 5):
     """
     Performs a local, in-memory cosine similarity search.
     This is a fallback for when Atlas $vectorSearch is not available.
+    Scores against the user's resident vector index (ids + embeddings only),
+    then fetches display fields for just the top-k documents.
     """
     try:
-        # 1. Fetch all candidate documents from local MongoDB
-        #    You MUST project the 'embedding' field
-        candidates_cursor = data_col.find(mongo_filter, {
-            "embedding": 1, "_id": 0, "title": 1, "summary": 1,
-            "tags": 1, "category": 1, "type": 1, "source_platform": 1,
-            "media_url": 1, "created_at": 1
-        })
-        
-        candidates = await candidates_cursor.to_list(length=None) # Fetch all
-        
-        if not candidates:
+        # 1. Get (or lazily load) the user's pre-normalized embedding matrix
+        with span("local_search.index", LOCAL_SEARCH_DURATION, phase="index"):
+            index = await get_resources().vector_indexes.get(user_id)
+        if index.size == 0:
             return []
 
-        # 2. Extract embeddings and calculate cosine similarity
-        embeddings = np.array([doc['embedding'] for doc in candidates if 'embedding' in doc])
-        query_vec = np.array(query_vector).reshape(1, -1)
-        
-        if embeddings.shape[0] == 0:
-            return [] # No documents with embeddings found
-
-        # Calculate norms
-        query_norm = np.linalg.norm(query_vec)
-        embed_norms = np.linalg.norm(embeddings, axis=1)
-        
-        # Avoid division by zero
-        if query_norm == 0 or np.any(embed_norms == 0):
-            print("⚠️ Local Search Warning: Zero-norm vector found.")
+        # 2. One matrix-vector product gives cosine scores for every candidate
+        #    (or just the ANN candidate set once the library is large enough)
+        with span("local_search.score", LOCAL_SEARCH_DURATION, phase="score"):
+            rows, scores = index.scores(query_vector, mongo_filter.get("type", "all"), limit)
+        if len(rows) == 0:
             return []
 
-        # 3. Calculate scores
-        # (embeddings @ query_vec.T) gives a (N, 1) matrix, .flatten() makes it (N,)
-        scores = (embeddings @ query_vec.T).flatten() / (embed_norms * query_norm)
-        
-        # 4. Combine docs with scores, sort, and return
-        scored_results = []
-        for i, doc in enumerate(candidates):
-            if 'embedding' in doc:
-                doc['score'] = scores[i]
-                del doc['embedding'] # Don't send the full vector back
-                scored_results.append(doc)
-            
-        top_results = sorted(scored_results, key=lambda x: x['score'], reverse=True)
-        return top_results[:limit]
-        
+        # 3. Select the top-k rows in NumPy
+        with span("local_search.top_k", LOCAL_SEARCH_DURATION, phase="top_k"):
+            top_rows, top_scores = top_k(rows, scores, limit)
+        score_by_id = {index.ids[row]: float(score) for row, score in zip(top_rows, top_scores)}
+
+        # 4. Hydrate metadata for the winners only, with a single $in query
+        projection = {field: 1 for field in METADATA_FIELDS}
+        with span("mongo.hydrate", MONGO_DURATION, operation="hydrate"):
+            docs = await get_resources().data_col.find(
+                {"_id": {"$in": list(score_by_id)}, "user_id": user_id}, projection
+            ).to_list(length=len(score_by_id))
+
+        top_results = []
+        for doc in docs:
+            doc['score'] = score_by_id[doc.pop('_id')]
+            top_results.append(doc)
+        return sorted(top_results, key=lambda x: x['score'], reverse=True)
+
     except Exception as e:
-        print(f"🚨 Local cosine search *itself* failed: {e}")
+        logger.error("local_search_failed", extra={"user_id": user_id, "error": str(e)})
         # Raise error from here to be caught by the main endpoint
         raise HTTPException(status_code=500, detail=f"Local cosine search failed: {e}")
+async def _atlas_filter_paths() -> set:
+    checked_at = _vector_filters["checked_at"]
+    if checked_at is None or time.monotonic() - checked_at > VECTOR_FILTER_RECHECK_SECONDS:
+        _vector_filters["paths"] = await vector_index_filter_paths(get_resources().db)
+        _vector_filters["checked_at"] = time.monotonic()
+    return _vector_filters["paths"]
+
 async def vector_search(user_id: str, query_vector: list, query_type: str, limit: int = 5):
     """
     Performs a vector search. Tries Atlas $vectorSearch first,
@@ -105,30 +187,82 @@ async def vector_search(user_id: str, query_vector: list, query_type: str, limit
     mongo_filter = {"user_id": user_id}
     if query_type != "all":
         mongo_filter["type"] = query_type
+    if EMBEDDING_DIMENSIONS:
+        # Stored vectors are Matryoshka-truncated, so the query must be too
+        query_vector = truncate_embedding(query_vector, EMBEDDING_DIMENSIONS).tolist()
+
+    # Vectors from another embedding model live in a different space (and often size).
+    # Atlas rejects filters on fields its index does not declare, so until vector_index
+    # has embedding_model the model is matched after the search, on a few extra candidates.
+    atlas_filter = dict(mongo_filter)
+    post_filter = []
+    search_limit = limit
+    if "embedding_model" in await _atlas_filter_paths():
+        atlas_filter["embedding_model"] = get_embedding_provider().model
+    else:
+        post_filter = [{"$match": embedding_model_filter()}, {"$limit": limit}]
+        search_limit = min(limit * 4, 100)
 
     try:
-        results = await data_col.aggregate([
-            {
-                "$vectorSearch": {
-                    "index": "vector_index", 
-                    "queryVector": query_vector,
-                    "path": "embedding",
-                    "numCandidates": 100,
-                    "limit": limit,
-                    "filter": mongo_filter
+        with span("mongo.vector_search", MONGO_DURATION, operation="vector_search"):
+            results = await get_resources().data_col.aggregate([
+                {
+                    "$vectorSearch": {
+                        "index": "vector_index", 
+                        "queryVector": query_vector,
+                        "path": "embedding",
+                        "numCandidates": 100,
+                        "limit": search_limit,
+                        "filter": atlas_filter
+                    }
+                },
+                *post_filter,
+                {
+                    "$project": {
+                        "_id": 0,
+                        "title": 1, "summary": 1,
+                        "type": 1, "source_platform": 1, "media_url": 1, "created_at": 1
+                    }
                 }
-            },
-            {
-                "$project": {
-                    "_id": 0,
-                    "title": 1, "summary": 1,
-                    "type": 1, "source_platform": 1, "media_url": 1, "created_at": 1
-                }
-            }
-        ]).to_list(length=limit)
-        print("✅ Atlas vector search successful.")
+            ]).to_list(length=limit)
+        SEARCH_PATH.inc(path="atlas")
         return results
 
     except Exception as e:
-        print(f"⚠️ Atlas vector search failed: {e}. Falling back to local similarity.")
-        return await _local_cosine_search(user_id, query_vector, mongo_filter, limit)
\ No newline at end of file
+        # Expected on non-Atlas deployments, but counted so a broken Atlas index is visible
+        SEARCH_PATH.inc(path="local")
+        logger.warning("atlas_vector_search_failed", extra={"error": str(e), "fallback": "local"})
+        # The resident index only loads the active model's vectors
+        return await _local_cosine_search(user_id, query_vector, mongo_filter, limit)
+
+async def search_user_data(user_id: str, query: str, limit: int = 5):
+    """
+    Full search for one query, served from the search result cache when the
+    same (query, type, limit) was already answered for the user's current data.
+    Returns (results, query_type, cached).
+    """
+    search_cache = get_resources().search_cache
+    generation = await search_cache.generation(user_id) if search_cache is not None else -1
+
+    # A repeat query has a memoized type, so the cache can be checked before any model call
+    query_type = _query_type_cache.get(normalize_text(query).lower())
+    if query_type is not None:
+        query_type_stats["memo_hits"] += 1
+        key = SearchResultCache.make_key(user_id, query, query_type, limit)
+        cached = search_cache.get(key, generation) if search_cache is not None else None
+        if cached is not None:
+            return cached, query_type, True
+        vector_query = await generate_embedding(query)
+    else:
+        # Independent of each other, so run the embedding and the type lookup together
+        vector_query, query_type = await asyncio.gather(generate_embedding(query), resolve_query_type(query))
+        key = SearchResultCache.make_key(user_id, query, query_type, limit)
+        # Results can outlive an evicted query-type memo
+        cached = search_cache.get(key, generation) if search_cache is not None else None
+        if cached is not None:
+            return cached, query_type, True
+
+    results = await vector_search(user_id, vector_query, query_type, limit)
+    if search_cache is not None:
+        search_cache.set(key, generation, results)
+    return results, query_type, False
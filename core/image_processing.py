@@ -0,0 +1,40 @@
+import io
+
+# Formats the vision model accepts as-is when re-encoding would not help
+_PASSTHROUGH_MIME = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif"}
+
+
+def compress_image(image_bytes: bytes, max_side: int = 1024, image_format: str = "JPEG", quality: int = 85):
+    """
+    Downsize an upload to the vision model's useful resolution and re-encode it
+    compactly. Runs in a worker process. Returns (bytes, mime_type).
+    """
+    # Pillow is only loaded once an image is actually processed
+    from PIL import Image, ImageOps
+    image = Image.open(io.BytesIO(image_bytes))
+    source_format = image.format
+    source_size = image.size
+    max_size = (max_side, max_side)
+
+    # JPEG can decode straight at a reduced scale, skipping most of the pixel work
+    image.draft("RGB", max_size)
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > max_side:
+        image.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    image_format = image_format.upper()
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        # JPEG has no alpha channel: flatten onto white
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+
+    buf = io.BytesIO()
+    image.save(buf, format=image_format, quality=quality, optimize=True)
+    compressed = buf.getvalue()
+
+    # Already-small uploads in a supported format are cheaper left alone
+    if len(image_bytes) <= len(compressed) and source_format in _PASSTHROUGH_MIME and max(source_size) <= max_side:
+        return image_bytes, _PASSTHROUGH_MIME[source_format]
+    return compressed, f"image/{image_format.lower()}"
@@ -0,0 +1,181 @@
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from pymongo.operations import SearchIndexModel
+from core.embeddings import get_embedding_provider, backfill_embedding_model
+from utils.config import (
+    get_embedding_storage_settings, get_embedding_cache_settings, get_url_cache_settings,
+    get_ingest_queue_settings
+)
+
+VECTOR_INDEX_NAME = "vector_index"
+
+
+def declared_indexes(users_collection: str) -> list[dict]:
+    """
+    Every regular index the app relies on, as
+    {collection, name, keys, options}. TTL values follow the cache settings.
+    """
+    _, _, embedding_cache_ttl_days = get_embedding_cache_settings()
+    _, _, url_cache_ttl_days = get_url_cache_settings()
+    job_ttl_days = get_ingest_queue_settings()[5]
+    return [
+        # register_user / login_user look users up by email
+        {"collection": users_collection, "name": "email_unique",
+         "keys": [("email", ASCENDING)], "options": {"unique": True}},
+        # Every search, index load and listing is scoped to one user, optionally one type
+        {"collection": "data", "name": "user_type_created",
+         "keys": [("user_id", ASCENDING), ("type", ASCENDING), ("created_at", DESCENDING)], "options": {}},
+        {"collection": "embedding_cache", "name": "created_at_ttl",
+         "keys": [("created_at", ASCENDING)], "options": {"expireAfterSeconds": embedding_cache_ttl_days * 24 * 3600}},
+        {"collection": "url_cache", "name": "updated_at_ttl",
+         "keys": [("updated_at", ASCENDING)], "options": {"expireAfterSeconds": url_cache_ttl_days * 24 * 3600}},
+        {"collection": "enrichment_cache", "name": "updated_at_ttl",
+         "keys": [("updated_at", ASCENDING)], "options": {"expireAfterSeconds": url_cache_ttl_days * 24 * 3600}},
+        # Ingest workers claim the oldest runnable job; /jobs/{id} reads by _id
+        {"collection": "jobs", "name": "status_run_after",
+         "keys": [("status", ASCENDING), ("run_after", ASCENDING)], "options": {}},
+        # Only finished jobs carry finished_at, so queued ones never expire
+        {"collection": "jobs", "name": "finished_at_ttl",
+         "keys": [("finished_at", ASCENDING)], "options": {"expireAfterSeconds": job_ttl_days * 24 * 3600}},
+    ]
+
+
+def vector_index_definition() -> dict:
+    """Atlas Vector Search definition matching the stored embeddings and the search filters."""
+    _, storage_dimensions = get_embedding_storage_settings()
+    return {
+        "fields": [
+            {"type": "vector", "path": "embedding",
+             "numDimensions": storage_dimensions or get_embedding_provider().dimensions,
+             "similarity": "cosine"},
+            {"type": "filter", "path": "user_id"},
+            {"type": "filter", "path": "type"},
+            {"type": "filter", "path": "embedding_model"},
+        ]
+    }
+
+
+def _compare_options(spec: dict, existing: dict) -> list[str]:
+    drift = []
+    if bool(spec["options"].get("unique")) != bool(existing.get("unique")):
+        drift.append(f"unique: expected {bool(spec['options'].get('unique'))}, found {bool(existing.get('unique'))}")
+    if spec["options"].get("expireAfterSeconds") != existing.get("expireAfterSeconds"):
+        drift.append(f"expireAfterSeconds: expected {spec['options'].get('expireAfterSeconds')}, found {existing.get('expireAfterSeconds')}")
+    return drift
+
+
+async def _ensure_index(db, spec: dict, create: bool) -> dict:
+    collection = db[spec["collection"]]
+    report = {"collection": spec["collection"], "name": spec["name"], "status": "ok", "detail": ""}
+    existing = await collection.index_information()
+    # Match on the key pattern so indexes created by hand under another name are recognised
+    match_name, match = next(((name, info) for name, info in existing.items() if info["key"] == spec["keys"]), (None, None))
+
+    if match is None:
+        if not create:
+            report["status"] = "missing"
+            return report
+        await collection.create_index(spec["keys"], name=spec["name"], **spec["options"])
+        report["status"] = "created"
+        return report
+
+    drift = _compare_options(spec, match)
+    if not drift:
+        return report
+    report["detail"] = "; ".join(drift)
+    only_ttl = all(d.startswith("expireAfterSeconds") for d in drift) and "expireAfterSeconds" in match
+    if create and only_ttl:
+        # A TTL change is applied in place; anything else needs a manual rebuild
+        await db.command({"collMod": spec["collection"],
+                          "index": {"name": match_name, "expireAfterSeconds": spec["options"]["expireAfterSeconds"]}})
+        report["status"] = "updated"
+    else:
+        report["status"] = "drift"
+    return report
+
+
+async def _ensure_vector_index(db, create: bool, update: bool) -> dict:
+    collection = db["data"]
+    report = {"collection": "data", "name": VECTOR_INDEX_NAME, "status": "ok", "detail": ""}
+    definition = vector_index_definition()
+    try:
+        existing = await collection.list_search_indexes(VECTOR_INDEX_NAME).to_list(None)
+    except OperationFailure as e:
+        # Self-hosted / local MongoDB: search falls back to the resident NumPy index
+        report["status"] = "unsupported"
+        report["detail"] = e.details.get("errmsg", str(e)) if e.details else str(e)
+        return report
+
+    if not existing:
+        if not create:
+            report["status"] = "missing"
+            return report
+        # Older documents need the embedding_model field before the index filters on it
+        await backfill_embedding_model(collection)
+        await collection.create_search_index(SearchIndexModel(definition, name=VECTOR_INDEX_NAME, type="vectorSearch"))
+        report["status"] = "created"
+        return report
+
+    current = existing[0].get("latestDefinition", {})
+    wanted_fields = sorted(definition["fields"], key=lambda f: f["path"])
+    current_fields = sorted(current.get("fields", []), key=lambda f: f.get("path", ""))
+    if current_fields == wanted_fields:
+        return report
+    report["detail"] = f"expected {wanted_fields}, found {current_fields}"
+    # New filter fields on an unchanged vector field are safe to apply on boot, like TTL changes
+    only_new_filters = all(f in wanted_fields for f in current_fields) and all(
+        f["type"] == "filter" for f in wanted_fields if f not in current_fields)
+    if update or (create and only_new_filters):
+        await backfill_embedding_model(collection)
+        # Atlas rebuilds the index in the background; queries keep using the old one until it is ready
+        await collection.update_search_index(VECTOR_INDEX_NAME, definition)
+        report["status"] = "updated"
+    else:
+        report["status"] = "drift"
+    return report
+
+
+async def vector_index_filter_paths(db) -> set:
+    """
+    Filter paths the Atlas vector_index can serve right now. Empty on
+    self-hosted MongoDB, without the index, or while it is (re)building.
+    """
+    try:
+        existing = await db["data"].list_search_indexes(VECTOR_INDEX_NAME).to_list(None)
+    except Exception:
+        return set()
+    if not existing or existing[0].get("status") != "READY":
+        return set()
+    return {f.get("path") for f in existing[0].get("latestDefinition", {}).get("fields", []) if f.get("type") == "filter"}
+
+
+async def ensure_indexes(db, users_collection: str, create: bool = True, update_vector_index: bool = False) -> list[dict]:
+    """
+    Verify every declared index. With `create`, missing indexes are built and
+    TTL drift and new Atlas filter fields are applied in place; other drift
+    (keys, uniqueness, the vector field unless `update_vector_index`) is only reported.
+    Returns one report per index with status ok/created/updated/missing/drift/unsupported/error.
+    """
+    reports = []
+    for spec in declared_indexes(users_collection):
+        try:
+            reports.append(await _ensure_index(db, spec, create))
+        except Exception as e:
+            # e.g. duplicate emails blocking the unique index
+            reports.append({"collection": spec["collection"], "name": spec["name"], "status": "error", "detail": str(e)})
+    try:
+        reports.append(await _ensure_vector_index(db, create, update_vector_index))
+    except Exception as e:
+        reports.append({"collection": "data", "name": VECTOR_INDEX_NAME, "status": "error", "detail": str(e)})
+    return reports
+
+
+def format_index_report(reports: list[dict]) -> str:
+    icons = {"ok": "✅", "created": "🆕", "updated": "🔧", "missing": "❌", "drift": "⚠️", "unsupported": "➖", "error": "❌"}
+    lines = []
+    for r in reports:
+        line = f"{icons.get(r['status'], '•')} {r['collection']}.{r['name']}: {r['status']}"
+        if r["detail"]:
+            line += f" ({r['detail']})"
+        lines.append(line)
+    return "\n".join(lines)
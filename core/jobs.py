@@ -0,0 +1,167 @@
+import asyncio
+import random
+from datetime import datetime, timezone, timedelta
+from bson import ObjectId
+from bson.binary import Binary
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from core.rate_limiter import ai_priority
+from core.log import get_logger
+from core.tracing import start_trace, trace_summary
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+# Raw items live inside the job document, which MongoDB caps at 16 MB
+MAX_PAYLOAD_BYTES = 15 * 1024 * 1024
+logger = get_logger("synapse.jobs")
+
+
+class IngestJobQueue:
+    """
+    MongoDB-backed queue for /add requests. The raw item is stored as a job
+    and a pool of asyncio worker tasks runs the ingestion pipeline for it,
+    retrying transient failures with exponential backoff. Jobs are claimed
+    atomically with find_one_and_update, so several app processes can share
+    one queue; a job whose worker died is picked up again once its lease expires.
+    """
+
+    def __init__(self, collection, workers: int = 4, max_attempts: int = 3, retry_backoff_seconds: float = 5,
+                 lease_seconds: float = 300, poll_interval_seconds: float = 1):
+        self._collection = collection
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self._tasks = []
+        self._wakeup = None
+        self.stats = {"enqueued": 0, "completed": 0, "retried": 0, "failed": 0}
+
+    async def enqueue(self, user_id: str, data_type: str, payload) -> str:
+        now = datetime.now(timezone.utc)
+        job_id = ObjectId()
+        await self._collection.insert_one({
+            "_id": job_id,
+            "user_id": user_id,
+            "data_type": data_type,
+            "payload": Binary(payload) if isinstance(payload, bytes) else payload,
+            "status": "queued",
+            "attempts": 0,
+            "run_after": now,
+            "created_at": now,
+            "updated_at": now,
+        })
+        self.stats["enqueued"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return str(job_id)
+
+    async def get(self, job_id: str, user_id: str):
+        """A user's job without its raw payload, or None if it does not exist (or is not theirs)."""
+        if not ObjectId.is_valid(job_id):
+            return None
+        job = await self._collection.find_one({"_id": ObjectId(job_id), "user_id": user_id}, {"payload": 0})
+        if job is None:
+            return None
+        job["job_id"] = str(job.pop("_id"))
+        return job
+
+    async def _claim(self):
+        now = datetime.now(timezone.utc)
+        return await self._collection.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "run_after": {"$lte": now}},
+                # Lease expired: the worker that claimed it crashed or was shut down
+                {"status": "running", "lease_until": {"$lt": now}},
+            ]},
+            {"$set": {"status": "running", "lease_until": now + timedelta(seconds=self.lease_seconds), "updated_at": now},
+             "$inc": {"attempts": 1}},
+            sort=[("run_after", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _run(self, handler, job: dict):
+        now = datetime.now(timezone.utc)
+        if job["attempts"] > self.max_attempts:
+            # Re-claimed after its lease expired too many times (e.g. it keeps crashing the worker)
+            await self._collection.update_one({"_id": job["_id"]}, {
+                "$set": {"status": "failed", "error": job.get("error") or "Worker lease expired", "updated_at": now, "finished_at": now},
+                "$unset": {"payload": "", "lease_until": ""},
+            })
+            self.stats["failed"] += 1
+            return
+        try:
+            payload = job["payload"]
+            # The job id doubles as the data document id, so a re-run after a crash cannot insert twice.
+            # Nobody is waiting on the HTTP response, so queued jobs yield the OpenAI quota to interactive calls
+            with ai_priority("background"):
+                result = await handler(job["user_id"], job["data_type"], bytes(payload) if isinstance(payload, Binary) else payload,
+                                       doc_id=job["_id"])
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            # Client errors (bad URL, unreadable image) will not succeed on retry
+            permanent = isinstance(e, HTTPException) and 400 <= e.status_code < 500
+            if permanent or job["attempts"] >= self.max_attempts:
+                await self._collection.update_one({"_id": job["_id"]}, {
+                    "$set": {"status": "failed", "error": detail, "updated_at": now, "finished_at": now},
+                    "$unset": {"payload": "", "lease_until": ""},
+                })
+                self.stats["failed"] += 1
+            else:
+                delay = self.retry_backoff_seconds * 2 ** (job["attempts"] - 1) * random.uniform(0.5, 1.5)
+                await self._collection.update_one({"_id": job["_id"]}, {
+                    "$set": {"status": "queued", "error": detail, "updated_at": now, "run_after": now + timedelta(seconds=delay)},
+                    "$unset": {"lease_until": ""},
+                })
+                self.stats["retried"] += 1
+            return
+
+        await self._collection.update_one({"_id": job["_id"]}, {
+            "$set": {"status": "done", "result": result, "error": None, "updated_at": now, "finished_at": now},
+            "$unset": {"payload": "", "lease_until": ""},
+        })
+        self.stats["completed"] += 1
+
+    async def _worker(self, handler):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.warning("ingest_job_claim_failed", extra={"error": str(e)})
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            with start_trace("ingest_job") as trace:
+                try:
+                    await self._run(handler, job)
+                except Exception as e:
+                    # Status update failed; the lease expiring will hand the job to another worker
+                    logger.error("ingest_job_bookkeeping_failed", extra={"job_id": str(job["_id"]), "error": str(e)})
+                logger.info("ingest_job", extra={
+                    "job_id": str(job["_id"]), "data_type": job["data_type"], "attempt": job["attempts"], **trace_summary(trace)
+                })
+
+    def start(self, handler):
+        """
+        Start the worker tasks. handler is an async callable
+        (user_id, data_type, payload, doc_id=...) returning a JSON-able result.
+        """
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(handler)) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def get_stats(self) -> dict:
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        counts = {doc["_id"]: doc["count"] async for doc in self._collection.aggregate(pipeline)}
+        return {**self.stats, "workers": len(self._tasks), "jobs_by_status": {status: counts.get(status, 0) for status in JOB_STATUSES}}
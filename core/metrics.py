@@ -0,0 +1,175 @@
+import bisect
+import math
+import threading
+
+# Latency buckets in seconds, from a cache hit up to a slow vision / scrape call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple, **extra) -> dict:
+        return {**dict(zip(self.labelnames, key)), **extra}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield self.name, self._labels(key), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (+Inf last), sum, count]
+        self._values = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def totals(self) -> dict:
+        """{label values: (count, sum)}, e.g. to diff two points in time."""
+        with self._lock:
+            return {key: (state[2], state[1]) for key, state in self._values.items()}
+
+    def samples(self):
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", self._labels(key, le=_format_value(float(bound))), cumulative
+            yield f"{self.name}_sum", self._labels(key), total
+            yield f"{self.name}_count", self._labels(key), count
+
+
+class StatsCollector:
+    """
+    Exports an existing `stats` dict (caches, batcher, limiter, ...) as gauges
+    at scrape time. Nested dicts become a label named `nested_label`.
+    """
+
+    def __init__(self, prefix: str, documentation: str, stats_fn, nested_label: str = "key", labels: dict = None):
+        self.prefix = prefix
+        self.documentation = documentation
+        self._stats_fn = stats_fn
+        self.nested_label = nested_label
+        self.labels = labels or {}
+
+    def render(self) -> list[str]:
+        try:
+            stats = self._stats_fn() or {}
+        except Exception:
+            return []
+        by_name = {}
+        for field, value in stats.items():
+            if isinstance(value, dict):
+                for inner, inner_value in value.items():
+                    if isinstance(inner_value, (int, float)):
+                        by_name.setdefault(f"{self.prefix}_{field}", []).append(({**self.labels, self.nested_label: inner}, inner_value))
+            elif isinstance(value, (int, float)):
+                by_name.setdefault(f"{self.prefix}_{field}", []).append((self.labels, value))
+        lines = []
+        for name, samples in by_name.items():
+            lines += [f"# HELP {name} {self.documentation}", f"# TYPE {name} gauge"]
+            lines += [f"{name}{_format_labels(labels)} {_format_value(float(value))}" for labels, value in samples]
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        key = getattr(metric, "name", None) or metric.prefix
+        self._metrics[key] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "synapse_http_request_duration_seconds", "Time to produce an HTTP response.", ("method", "route", "status"))
+LLM_DURATION = registry.histogram(
+    "synapse_llm_request_duration_seconds", "Latency of each LLM helper call, retries included.", ("helper",))
+EMBEDDING_DURATION = registry.histogram(
+    "synapse_embedding_request_duration_seconds", "Latency of one embeddings API request (a batch of texts).")
+URL_FETCH_DURATION = registry.histogram(
+    "synapse_url_fetch_duration_seconds", "Fetching and extracting one URL, cache hits included.")
+MONGO_DURATION = registry.histogram(
+    "synapse_mongo_operation_duration_seconds", "MongoDB operations on the request paths.", ("operation",))
+LOCAL_SEARCH_DURATION = registry.histogram(
+    "synapse_local_search_duration_seconds", "Phases of the local (non-Atlas) vector search.", ("phase",))
+SEARCH_PATH = registry.counter(
+    "synapse_search_path_total", "Searches answered by Atlas $vectorSearch or the local fallback.", ("path",))
+AI_FALLBACKS = registry.counter(
+    "synapse_ai_fallback_total", "LLM helpers that returned a placeholder instead of a model answer.", ("helper", "fallback"))
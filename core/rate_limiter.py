@@ -0,0 +1,254 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+
+# Lower rank is served first when calls are queued behind the limiter
+AI_PRIORITIES = {"search": 0, "ingest": 1, "background": 2}
+_ai_priority = ContextVar("ai_priority", default="ingest")
+
+# Buckets hold this many seconds of quota, so bursts cannot run far ahead of the per-minute rate
+BURST_SECONDS = 10
+# Rough vision cost of one image of at most 1024px per side
+IMAGE_TOKEN_ESTIMATE = 800
+DEFAULT_COMPLETION_TOKENS = 512
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, conservative token estimate (~3 characters per token)."""
+    return len(text) // 3 + 1
+
+
+def classify_ai_error(error: Exception):
+    """(retryable, rate_limited, retry_after_seconds) for an OpenAI SDK error; anything else is final."""
+    import openai
+    retry_after = None
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+    if isinstance(error, openai.RateLimitError):
+        # An exhausted quota does not recover by waiting
+        return getattr(error, "code", None) != "insufficient_quota", True, retry_after
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)):
+        return True, False, retry_after
+    return False, False, None
+
+
+def current_ai_priority() -> str:
+    return _ai_priority.get()
+
+
+@contextmanager
+def ai_priority(name: str):
+    """Run the enclosed OpenAI calls (and tasks created inside) under a priority class."""
+    token = _ai_priority.set(name)
+    try:
+        yield
+    finally:
+        _ai_priority.reset(token)
+
+
+class _TokenBucket:
+    """Continuously refilling bucket; a rate of 0 means unlimited."""
+
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60
+        self.capacity = max(self.rate * BURST_SECONDS, 1.0)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        # A single call larger than the bucket is let through once the bucket is full
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount: float):
+        if self.rate:
+            self.level -= amount
+
+    def refund(self, amount: float):
+        # Negative amounts charge usage that exceeded the estimate
+        if self.rate:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Shared limiter for one OpenAI quota: request and token buckets sized from
+    the per-minute limits, an adaptive concurrency cap (halved on every 429,
+    raised by one after a window of successes) and a priority queue so search
+    calls are dispatched before ingestion. `call` retries 429s, timeouts and 5xx
+    with exponential backoff and jitter, honouring Retry-After.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0, max_concurrency: int = 32,
+                 min_concurrency: int = 1, max_retries: int = 5, backoff_seconds: float = 1.0, max_backoff_seconds: float = 60):
+        self._requests = _TokenBucket(requests_per_minute)
+        self._tokens = _TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.in_flight = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._timer = None
+        self._loop = None
+        self.stats = {
+            "calls": 0, "retries": 0, "rate_limited": 0, "errors": 0,
+            "tokens_estimated": 0, "tokens_used": 0,
+            "wait_ms_total": {name: 0.0 for name in AI_PRIORITIES},
+        }
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_flight >= self.concurrency_limit:
+                return
+            wait = max(self._paused_until - now, self._requests.time_until(1, now), self._tokens.time_until(tokens, now))
+            if wait > 0:
+                self._timer = self._loop.call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._requests.take(1)
+            self._tokens.take(tokens)
+            self.in_flight += 1
+            future.set_result(None)
+
+    async def acquire(self, tokens: int, priority: str = "ingest"):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A new event loop (e.g. a CLI run) must not inherit waiters from the old one
+            self._loop, self._waiters, self._timer, self.in_flight = loop, [], None, 0
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (AI_PRIORITIES.get(priority, 1), next(self._seq), tokens, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self, rate_limited: bool = False, retry_after: float = None):
+        self.in_flight -= 1
+        if rate_limited:
+            # Multiplicative decrease, plus a global pause so queued calls do not pile onto the 429
+            self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit // 2)
+            self._successes = 0
+            self._paused_until = max(self._paused_until, time.monotonic() + (retry_after or self.backoff_seconds))
+        else:
+            self._successes += 1
+            if self._successes >= self.concurrency_limit and self.concurrency_limit < self.max_concurrency:
+                self.concurrency_limit += 1
+                self._successes = 0
+        self._dispatch()
+
+    async def call(self, fn, *args, tokens: int = 1, **kwargs):
+        priority = current_ai_priority()
+        self.stats["tokens_estimated"] += tokens
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            await self.acquire(tokens, priority)
+            self.stats["wait_ms_total"][priority] = self.stats["wait_ms_total"].get(priority, 0.0) + (time.monotonic() - started) * 1000
+            self.stats["calls"] += 1
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                retryable, rate_limited, retry_after = classify_ai_error(e)
+                self._release(rate_limited, retry_after)
+                if rate_limited:
+                    self.stats["rate_limited"] += 1
+                if not retryable or attempt == self.max_retries:
+                    self.stats["errors"] += 1
+                    raise
+                self.stats["retries"] += 1
+                cap = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt)
+                await asyncio.sleep(max(retry_after or 0, cap / 2 + random.uniform(0, cap / 2)))
+                continue
+            except BaseException:
+                self._release()
+                raise
+
+            used = getattr(getattr(result, "usage", None), "total_tokens", None)
+            if used:
+                self.stats["tokens_used"] += used
+                self._tokens.refund(tokens - used)
+            self._release()
+            return result
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "wait_ms_total": {k: round(v, 2) for k, v in self.stats["wait_ms_total"].items()},
+            "concurrency_limit": self.concurrency_limit,
+            "in_flight": self.in_flight,
+            "queued": sum(1 for *_, future in self._waiters if not future.done()),
+        }
+
+
+def estimate_chat_tokens(messages: list, max_tokens: int = None) -> int:
+    tokens = max_tokens or DEFAULT_COMPLETION_TOKENS
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += estimate_tokens(content)
+            continue
+        for part in content or []:
+            tokens += IMAGE_TOKEN_ESTIMATE if part.get("type") == "image_url" else estimate_tokens(part.get("text", ""))
+    return tokens
+
+
+class RateLimitedAIClient:
+    """
+    Drop-in wrapper around AsyncOpenAI: chat.completions.create and
+    embeddings.create go through their limiters, everything else is passed
+    to the wrapped client.
+    """
+
+    def __init__(self, client, chat_limiter: RateLimiter, embedding_limiter: RateLimiter):
+        self._client = client
+        self.chat_limiter = chat_limiter
+        self.embedding_limiter = embedding_limiter
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_chat_completion))
+        self.embeddings = SimpleNamespace(create=self._create_embeddings)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    async def _create_chat_completion(self, **kwargs):
+        tokens = estimate_chat_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+        return await self.chat_limiter.call(self._client.chat.completions.create, tokens=tokens, **kwargs)
+
+    async def _create_embeddings(self, **kwargs):
+        inputs = kwargs.get("input", [])
+        tokens = sum(estimate_tokens(text) for text in ([inputs] if isinstance(inputs, str) else inputs))
+        return await self.embedding_limiter.call(self._client.embeddings.create, tokens=tokens, **kwargs)
+
+    def get_stats(self) -> dict:
+        return {"chat": self.chat_limiter.get_stats(), "embeddings": self.embedding_limiter.get_stats()}
@@ -0,0 +1,151 @@
+import os
+import re
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+from utils.config import (
+    load_environments, get_mongo_client_settings, get_openai_client_settings, get_embedding_cache_settings,
+    get_url_cache_settings, get_url_fetch_settings, get_vector_index_settings, get_ann_settings, get_ingest_queue_settings,
+    get_openai_rate_limit_settings, get_search_cache_settings
+)
+from core.embedding_cache import EmbeddingCache
+from core.embeddings import get_embedding_provider, embedding_model_filter
+from core.jobs import IngestJobQueue
+from core.rate_limiter import RateLimiter, RateLimitedAIClient
+from core.search_cache import SearchResultCache
+from core.url_cache import UrlContentCache, EnrichmentCache
+from core.url_fetcher import UrlFetcher
+from core.vector_index import VectorIndexRegistry
+from core.workers import shutdown_pools
+
+
+class Resources:
+    """
+    Process-wide clients shared by every core module: one MongoDB pool, one
+    OpenAI client, one HTTP fetcher and the caches built on top of them.
+    Started and closed by the FastAPI lifespan hook in main.py.
+    """
+
+    def __init__(self):
+        self.mongo_client = None
+        self.db = None
+        self.data_col = None
+        self.users_col = None
+        self.ai_client = None
+        self.url_fetcher = None
+        self.embedding_cache = None
+        self.url_content_cache = None
+        self.enrichment_cache = None
+        self.vector_indexes = None
+        self.ingest_jobs = None
+        self.search_cache = None
+
+    @property
+    def started(self) -> bool:
+        return self.mongo_client is not None
+
+    def start(self, mongo_client=None, ai_client=None):
+        """Build every shared resource. Pre-built clients can be injected (benchmarks, scripts)."""
+        mongodb_URL, mongodb, users_collection, _, OPENAI_API_KEY = load_environments()
+
+        if mongo_client is None:
+            (max_pool_size, min_pool_size, max_idle_ms, connect_timeout_ms,
+             server_selection_timeout_ms, socket_timeout_ms, compressors) = get_mongo_client_settings()
+            options = {
+                "maxPoolSize": max_pool_size,
+                "minPoolSize": min_pool_size,
+                "maxIdleTimeMS": max_idle_ms,
+                "connectTimeoutMS": connect_timeout_ms,
+                "serverSelectionTimeoutMS": server_selection_timeout_ms,
+                "socketTimeoutMS": socket_timeout_ms or None,
+            }
+            if compressors:
+                options["compressors"] = compressors
+            mongo_client = AsyncIOMotorClient(mongodb_URL, **options)
+
+        (rate_limit_enabled, chat_rpm, chat_tpm, embedding_rpm, embedding_tpm,
+         max_concurrency, rate_limit_retries, backoff_seconds) = get_openai_rate_limit_settings()
+        if ai_client is None:
+            # The SDK (and its large type tree) is only loaded when a real client is needed
+            from openai import AsyncOpenAI
+            openai_timeout, openai_max_retries, openai_max_connections = get_openai_client_settings()
+            ai_client = AsyncOpenAI(
+                api_key=OPENAI_API_KEY,
+                timeout=openai_timeout,
+                # The limiter retries with shared backoff; SDK retries would bypass it
+                max_retries=0 if rate_limit_enabled else openai_max_retries,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=openai_max_connections, max_keepalive_connections=openai_max_connections),
+                    timeout=openai_timeout,
+                ),
+            )
+
+        if rate_limit_enabled:
+            # Every chat / embedding call in the process shares the same quota
+            ai_client = RateLimitedAIClient(
+                ai_client,
+                RateLimiter(chat_rpm, chat_tpm, max_concurrency, max_retries=rate_limit_retries, backoff_seconds=backoff_seconds),
+                RateLimiter(embedding_rpm, embedding_tpm, max_concurrency, max_retries=rate_limit_retries, backoff_seconds=backoff_seconds),
+            )
+
+        self.mongo_client = mongo_client
+        self.ai_client = ai_client
+        self.db = mongo_client[mongodb]
+        self.data_col = self.db["data"]
+        self.users_col = self.db[users_collection]
+
+        cache_enabled, cache_max_entries, _ = get_embedding_cache_settings()
+        # Shared by ingestion and search so re-saved articles and repeated queries skip the API
+        self.embedding_cache = EmbeddingCache(self.db["embedding_cache"], cache_max_entries) if cache_enabled else None
+
+        # Cache TTL indexes are declared in core/indexes.py
+        url_cache_enabled, url_cache_fresh_seconds, _ = get_url_cache_settings()
+        self.url_content_cache = UrlContentCache(self.db["url_cache"], url_cache_fresh_seconds) if url_cache_enabled else None
+        # Enrichment of identical extracted text is shared across users
+        self.enrichment_cache = EnrichmentCache(self.db["enrichment_cache"]) if url_cache_enabled else None
+        # One pooled, non-blocking fetcher for every url ingestion
+        self.url_fetcher = UrlFetcher(*get_url_fetch_settings(), cache=self.url_content_cache)
+
+        memory_budget_mb, index_max_age_seconds = get_vector_index_settings()
+        ann_backend, ann_min_rows, ann_dir, ann_nprobe, ann_ef = get_ann_settings()
+        # Resident per-user embedding matrices (plus optional ANN structures) for the local fallback search
+        # Persisted ANN structures are per embedding model, so switching models never loads a stale one
+        ann_dir = os.path.join(ann_dir, re.sub(r"[^A-Za-z0-9._-]", "_", get_embedding_provider().model))
+        self.vector_indexes = VectorIndexRegistry(self.data_col, memory_budget_mb * 1024 * 1024, index_max_age_seconds,
+                                                  ann_backend, ann_min_rows, ann_dir, ann_nprobe, ann_ef,
+                                                  doc_filter=embedding_model_filter())
+
+        search_cache_enabled, search_cache_size, search_cache_shared = get_search_cache_settings()
+        # Another worker inserting for a user also makes this process's resident index for them stale
+        self.search_cache = SearchResultCache(
+            self.db["search_generations"] if search_cache_shared else None, search_cache_size,
+            on_external_change=self.vector_indexes.invalidate,
+        ) if search_cache_enabled else None
+
+        _, ingest_workers, ingest_max_attempts, ingest_retry_backoff_seconds, ingest_lease_seconds, _ = get_ingest_queue_settings()
+        # Workers are started by the lifespan only when INGEST_MODE=async
+        self.ingest_jobs = IngestJobQueue(self.db["jobs"], ingest_workers, ingest_max_attempts,
+                                          ingest_retry_backoff_seconds, ingest_lease_seconds)
+        return self
+
+    async def close(self):
+        if self.ingest_jobs is not None:
+            # Jobs interrupted here are re-claimed once their lease expires
+            await self.ingest_jobs.stop()
+        if self.url_fetcher is not None:
+            await self.url_fetcher.aclose()
+        if self.ai_client is not None and hasattr(self.ai_client, "close"):
+            await self.ai_client.close()
+        if self.mongo_client is not None:
+            self.mongo_client.close()
+        shutdown_pools()
+        self.__init__()
+
+
+resources = Resources()
+
+
+def get_resources() -> Resources:
+    """The shared registry; started lazily when used outside the app lifespan (CLI, scripts)."""
+    if not resources.started:
+        resources.start()
+    return resources
@@ -0,0 +1,93 @@
+from cachetools import LRUCache
+from pymongo import ReturnDocument
+from core.embedding_cache import normalize_text
+from core.log import get_logger
+
+logger = get_logger("synapse.search")
+
+
+class SearchResultCache:
+    """
+    In-process LRU of search results keyed by (user_id, normalized query,
+    query_type, limit) and tagged with the user's generation number. Every
+    insert bumps the generation, so stale entries simply stop matching.
+
+    With a `generations` collection the counters live in MongoDB and are shared
+    by every app process; without it they are process-local (single worker).
+    `on_external_change(user_id)` is called when another process is seen to
+    have bumped a user, so process-local state (the resident vector index) can
+    be dropped as well.
+    """
+
+    def __init__(self, generations=None, max_entries: int = 5000, on_external_change=None):
+        self._entries = LRUCache(maxsize=max_entries)
+        self._generations = generations
+        self._known = {}
+        self._on_external_change = on_external_change
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "bumps": 0, "external_changes": 0, "errors": 0}
+
+    @staticmethod
+    def make_key(user_id: str, query: str, query_type: str, limit: int) -> tuple:
+        return (user_id, normalize_text(query).lower(), query_type, limit)
+
+    async def generation(self, user_id: str) -> int:
+        if self._generations is None:
+            return self._known.get(user_id, 0)
+        try:
+            doc = await self._generations.find_one({"_id": user_id})
+        except Exception as e:
+            logger.warning("search_generation_lookup_failed", extra={"user_id": user_id, "error": str(e)})
+            self.stats["errors"] += 1
+            # Unknown generation: never serve from (or store into) the cache
+            return -1
+        current = doc["generation"] if doc else 0
+        known = self._known.get(user_id)
+        if known is not None and known != current:
+            self.stats["external_changes"] += 1
+            if self._on_external_change is not None:
+                self._on_external_change(user_id)
+        self._known[user_id] = current
+        return current
+
+    def get(self, key: tuple, generation: int):
+        entry = self._entries.get(key)
+        if generation >= 0 and entry is not None and entry[0] == generation:
+            self.stats["hits"] += 1
+            return list(entry[1])
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key: tuple, generation: int, results: list):
+        if generation < 0:
+            return
+        self._entries[key] = (generation, list(results))
+        self.stats["stores"] += 1
+
+    async def bump(self, user_id: str):
+        """Invalidate every cached search of this user (call after inserting their data)."""
+        self.stats["bumps"] += 1
+        if self._generations is None:
+            self._known[user_id] = self._known.get(user_id, 0) + 1
+            return
+        try:
+            doc = await self._generations.find_one_and_update(
+                {"_id": user_id}, {"$inc": {"generation": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+            )
+            self._known[user_id] = doc["generation"]
+        except Exception as e:
+            # Fall back to forgetting this user's entries locally
+            logger.warning("search_generation_bump_failed", extra={"user_id": user_id, "error": str(e)})
+            self.stats["errors"] += 1
+            for key in [k for k in self._entries.keys() if k[0] == user_id]:
+                self._entries.pop(key, None)
+
+    async def bump_all(self):
+        """Invalidate every user's cached searches, e.g. after re-embedding the corpus."""
+        self._entries.clear()
+        self._known.clear()
+        if self._generations is not None:
+            await self._generations.update_many({}, {"$inc": {"generation": 1}})
+
+    def get_stats(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "entries": len(self._entries), "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0}
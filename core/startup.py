@@ -0,0 +1,60 @@
+import subprocess
+import sys
+import time
+
+# Set when this module is first imported, i.e. at the top of main.py
+_STARTED = time.perf_counter()
+
+
+class StartupReport:
+    """
+    Wall-clock time of each cold start phase (imports, resources, index check, ...)
+    of this process. Logged once the app is ready and exported on /metrics.
+    """
+
+    def __init__(self, started: float):
+        self._last = started
+        self.started = started
+        self.phases = {}
+        self.ready_seconds = None
+
+    def mark(self, phase: str):
+        """Close the current phase: everything since the previous mark is attributed to `phase`."""
+        now = time.perf_counter()
+        self.phases[phase] = round(self.phases.get(phase, 0.0) + now - self._last, 4)
+        self._last = now
+
+    def ready(self):
+        self.ready_seconds = round(time.perf_counter() - self.started, 4)
+
+    def get_stats(self) -> dict:
+        return {"phase_seconds": dict(self.phases), "ready_seconds": self.ready_seconds or 0.0}
+
+
+startup_report = StartupReport(_STARTED)
+
+
+def import_time_breakdown(module: str = "main", top: int = 15) -> dict:
+    """
+    Import `module` in a fresh interpreter with -X importtime and attribute the
+    self time of every imported module to its top-level package (first-party
+    modules are kept separate). Returns {"total_ms": ..., "packages": [(name, ms), ...]}.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"import {module} failed")
+    by_package = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        root = name.split(".")[0]
+        key = name if root in ("core", "routes", "utils", "main", "auth", "models") else root
+        by_package[key] = by_package.get(key, 0) + int(self_us)
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "total_ms": round(sum(by_package.values()) / 1000, 1),
+        "packages": [(name, round(us / 1000, 1)) for name, us in ranked[:top]],
+    }
@@ -0,0 +1,97 @@
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from core.log import get_logger
+from core.metrics import HTTP_REQUEST_DURATION
+
+# Bulk imports can produce thousands of spans; keep the log line bounded
+MAX_SPANS = 200
+_current_trace = ContextVar("current_trace", default=None)
+logger = get_logger("synapse.trace")
+
+
+def current_trace_id():
+    trace = _current_trace.get()
+    return trace["trace_id"] if trace else None
+
+
+@contextmanager
+def start_trace(name: str):
+    """Collect the spans of one unit of work (an HTTP request, an ingest job)."""
+    trace = {"trace_id": uuid.uuid4().hex[:16], "name": name, "started": time.perf_counter(), "spans": [], "dropped_spans": 0}
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, histogram=None, **labels):
+    """
+    Time the enclosed block: observe it on `histogram` (with `labels`) and
+    record it on the current trace, if any. Usable around awaits; concurrent
+    child tasks share the trace of the request that created them.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if histogram is not None:
+            histogram.observe(elapsed, **labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            if len(trace["spans"]) < MAX_SPANS:
+                trace["spans"].append({
+                    "name": name,
+                    "start_ms": round((started - trace["started"]) * 1000, 2),
+                    "duration_ms": round(elapsed * 1000, 2),
+                })
+            else:
+                trace["dropped_spans"] += 1
+
+
+def trace_summary(trace: dict) -> dict:
+    return {
+        "trace_id": trace["trace_id"],
+        "duration_ms": round((time.perf_counter() - trace["started"]) * 1000, 2),
+        "spans": trace["spans"],
+        "dropped_spans": trace["dropped_spans"],
+    }
+
+
+class RequestTracingMiddleware:
+    """
+    ASGI middleware: one trace per HTTP request, covering the whole response
+    (streamed bodies included). Records the request histogram, returns the
+    trace id in an X-Trace-Id header and logs the spans as one structured line.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+        with start_trace(f"{scope['method']} {scope['path']}") as trace:
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    status["code"] = message["status"]
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", trace["trace_id"].encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                summary = trace_summary(trace)
+                # Route template (e.g. /jobs/{job_id}) keeps label cardinality bounded
+                route = getattr(scope.get("route"), "path", "unmatched")
+                HTTP_REQUEST_DURATION.observe(summary["duration_ms"] / 1000, method=scope["method"], route=route, status=status["code"])
+                logger.info("request", extra={
+                    "method": scope["method"], "path": scope["path"], "route": route, "status": status["code"], **summary
+                })
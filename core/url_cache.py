@@ -0,0 +1,127 @@
+import hashlib
+from datetime import datetime, timezone
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from core.embedding_cache import normalize_text
+from core.log import get_logger
+
+logger = get_logger("synapse.cache")
+# Query parameters that never change the page content
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref", "ref_src", "si", "feature"}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form used as the cache key: lower-case scheme/host, no default
+    port, fragment or tracking parameters, sorted query, and youtu.be /
+    mobile YouTube links folded into www.youtube.com/watch?v=...
+    """
+    parsed = urlparse(url.strip())
+    scheme = (parsed.scheme or "http").lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and not ((scheme == "http" and parsed.port == 80) or (scheme == "https" and parsed.port == 443)):
+        host = f"{host}:{parsed.port}"
+    path = parsed.path or "/"
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+             if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS]
+
+    if host in ("youtu.be", "www.youtu.be") and path.strip("/"):
+        host, query = "www.youtube.com", [("v", path.strip("/"))] + query
+        path = "/watch"
+    elif host in ("youtube.com", "m.youtube.com"):
+        host = "www.youtube.com"
+
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return urlunparse((scheme, host, path, "", urlencode(sorted(query)), ""))
+
+
+class _MongoTTLCache:
+    """
+    Mongo-backed key/value cache whose entries expire through a TTL index on
+    updated_at (maintained by core/indexes.py).
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    async def _get(self, key: str):
+        try:
+            doc = await self._collection.find_one({"_id": key})
+        except Exception as e:
+            logger.warning("cache_lookup_failed", extra={"collection": self._collection.name, "error": str(e)})
+            self.stats["errors"] += 1
+            return None
+        self.stats["hits" if doc else "misses"] += 1
+        return doc
+
+    async def _set(self, key: str, fields: dict):
+        try:
+            await self._collection.update_one(
+                {"_id": key},
+                {"$set": {**fields, "updated_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+            self.stats["writes"] += 1
+        except Exception as e:
+            # Best-effort: a cache write must never fail an ingestion
+            logger.warning("cache_write_failed", extra={"collection": self._collection.name, "error": str(e)})
+            self.stats["errors"] += 1
+
+    def get_stats(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0}
+
+
+class UrlContentCache(_MongoTTLCache):
+    """
+    Fetched and extracted page content keyed by canonical URL, with the
+    ETag / Last-Modified validators needed for conditional refreshes.
+    """
+
+    def __init__(self, collection, fresh_seconds: int = 3600):
+        super().__init__(collection)
+        self.fresh_seconds = fresh_seconds
+
+    async def get(self, canonical_url: str):
+        return await self._get(canonical_url)
+
+    def is_fresh(self, entry: dict) -> bool:
+        fetched_at = entry.get("fetched_at")
+        if fetched_at is None:
+            return False
+        if fetched_at.tzinfo is None:
+            fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - fetched_at).total_seconds() < self.fresh_seconds
+
+    async def set(self, canonical_url: str, title: str, text: str, etag: str = None, last_modified: str = None):
+        await self._set(canonical_url, {
+            "title": title, "text": text, "etag": etag, "last_modified": last_modified,
+            "fetched_at": datetime.now(timezone.utc),
+        })
+
+    async def touch(self, canonical_url: str):
+        """Mark an entry as freshly validated after a 304 Not Modified."""
+        await self._set(canonical_url, {"fetched_at": datetime.now(timezone.utc)})
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EnrichmentCache(_MongoTTLCache):
+    """
+    AI enrichment results (summary, tags, category) keyed by a hash of the
+    extracted text, so identical content saved by different users is only
+    sent to the model once.
+    """
+
+    async def get(self, text: str):
+        doc = await self._get(content_hash(text))
+        if not doc:
+            return None
+        return {"summary": doc.get("summary"), "tags": doc.get("tags", []), "category": doc.get("category", [])}
+
+    async def set(self, text: str, summary: str, tags: list, category: list):
+        """Only call with real model output: entries are shared across users for the whole TTL."""
+        await self._set(content_hash(text), {"summary": summary, "tags": tags, "category": category})
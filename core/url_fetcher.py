@@ -0,0 +1,116 @@
+import asyncio
+from urllib.parse import urlparse
+import httpx
+from core.workers import run_in_process
+from core.url_cache import canonicalize_url
+
+
+def extract_article(url: str, html: str):
+    """Parse already-downloaded HTML with newspaper3k. Runs in a worker process."""
+    # Imported on first use (in the worker), so the API process never loads nltk / lxml for it
+    import newspaper
+    article = newspaper.Article(url)
+    article.download(input_html=html)
+    article.parse()
+    return article.title, article.text
+
+
+class UrlFetcher:
+    """
+    Async page fetcher: one shared httpx connection pool, a concurrency cap per
+    host, request timeouts, a response size cap, and article extraction in the
+    process pool so neither network nor parsing blocks the event loop.
+    With a UrlContentCache attached, recently fetched pages are served from
+    the cache and older ones are revalidated with conditional GETs.
+    """
+
+    def __init__(self, timeout: float = 10, max_bytes: int = 5 * 1024 * 1024, per_host_limit: int = 4,
+                 max_connections: int = 100, user_agent: str = "Mozilla/5.0 (compatible; SynapseBrain/1.0)",
+                 cache=None):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.per_host_limit = per_host_limit
+        self.max_connections = max_connections
+        self.user_agent = user_agent
+        self._client = None
+        self._loop = None
+        self._host_limits = {}
+        self.cache = cache
+        self.stats = {"downloads": 0, "fresh_hits": 0, "not_modified": 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._loop = loop
+            self._host_limits = {}
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections // 2),
+                follow_redirects=True,
+                headers={"User-Agent": self.user_agent},
+            )
+        return self._client
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    async def fetch_html(self, url: str, etag: str = None, last_modified: str = None):
+        """
+        Download a page, reading at most `max_bytes` of the body.
+        Returns (html, etag, last_modified); html is None when the server
+        answers 304 Not Modified to the conditional headers.
+        """
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.netloc:
+            raise ValueError(f"Unsupported URL: {url}")
+
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        client = self._get_client()
+        async with self._host_limit(parsed.netloc.lower()):
+            async with client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304:
+                    return None, etag, last_modified
+                response.raise_for_status()
+                self.stats["downloads"] += 1
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) >= self.max_bytes:
+                        # Enough for extraction; stop downloading oversized pages
+                        del body[self.max_bytes:]
+                        break
+                html = bytes(body).decode(response.encoding or "utf-8", errors="replace")
+                return html, response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+    async def fetch(self, url: str):
+        """Return (title, text) for a URL, using the content cache when one is attached."""
+        canonical = canonicalize_url(url)
+        cached = await self.cache.get(canonical) if self.cache is not None else None
+        if cached and self.cache.is_fresh(cached):
+            self.stats["fresh_hits"] += 1
+            return cached["title"], cached["text"]
+
+        html, etag, last_modified = await self.fetch_html(
+            url, cached.get("etag") if cached else None, cached.get("last_modified") if cached else None
+        )
+        if html is None:
+            self.stats["not_modified"] += 1
+            await self.cache.touch(canonical)
+            return cached["title"], cached["text"]
+
+        title, text = await run_in_process(extract_article, url, html)
+        if self.cache is not None and text:
+            await self.cache.set(canonical, title, text, etag, last_modified)
+        return title, text
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,238 @@
+import asyncio
+import time
+from collections import OrderedDict
+import numpy as np
+from core.ann import create_ann_index, load_ann_index
+from core.embedding_codec import decode_embedding, truncate_embedding
+from core.log import get_logger
+from core.metrics import MONGO_DURATION
+from core.tracing import span
+
+logger = get_logger("synapse.search")
+
+# Display fields hydrated for each search hit (everything except the embedding itself)
+METADATA_FIELDS = ("title", "summary", "tags", "category", "type", "source_platform", "media_url", "created_at")
+
+
+def top_k(rows: np.ndarray, scores: np.ndarray, k: int):
+    """
+    Pick the k best-scoring rows with argpartition (O(N)) and sort only those
+    k winners, instead of sorting every candidate.
+    Returns (rows, scores) ordered by descending score.
+    """
+    if k <= 0 or len(scores) == 0:
+        return rows[:0], scores[:0]
+    if k < len(scores):
+        winners = np.argpartition(-scores, k - 1)[:k]
+    else:
+        winners = np.arange(len(scores))
+    winners = winners[np.argsort(-scores[winners], kind="stable")]
+    return rows[winners], scores[winners]
+
+
+class UserVectorIndex:
+    """
+    Resident index over one user's documents: a contiguous float32 matrix of
+    L2-normalized embeddings plus parallel id/type arrays, so a search is a
+    single matrix-vector product. Display metadata is not kept here; callers
+    hydrate the winning ids from MongoDB.
+    """
+
+    def __init__(self, user_id: str, dim: int, capacity: int = 0):
+        self.user_id = user_id
+        self.dim = dim
+        self._matrix = np.zeros((max(capacity, 16), dim), dtype=np.float32)
+        self.size = 0
+        self.ids = []
+        self.types = []
+        self.loaded_at = time.monotonic()
+        # Optional approximate-nearest-neighbour structure over `matrix`
+        self.ann = None
+        self.ann_dirty = False
+
+    @classmethod
+    def from_documents(cls, user_id: str, docs: list[dict]):
+        # Stored binary vectors report their byte count as len(), so measure decoded vectors
+        dims = [len(vector) for vector in (decode_embedding(d.get("embedding")) for d in docs) if len(vector)]
+        if not dims:
+            return cls(user_id, dim=0)
+        # Mixed-dimension corpora: index the dominant dimension, skip the rest
+        dim = max(set(dims), key=dims.count)
+        index = cls(user_id, dim, capacity=len(docs))
+        for doc in docs:
+            index.add(doc)
+        return index
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        # Rough id/type allowance on top of the exact matrix size
+        return self._matrix.nbytes + self.size * 128
+
+    def add(self, doc: dict) -> bool:
+        if self.dim == 0:
+            return False
+        vector = decode_embedding(doc.get("embedding")).astype(np.float32, copy=False)
+        if vector.shape[0] != self.dim:
+            return False
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return False
+
+        if self.size == self._matrix.shape[0]:
+            grown = np.zeros((self._matrix.shape[0] * 2, self.dim), dtype=np.float32)
+            grown[:self.size] = self._matrix[:self.size]
+            self._matrix = grown
+        self._matrix[self.size] = vector / norm
+        if self.ann is not None:
+            self.ann.add(self.size, self._matrix[self.size])
+            self.ann_dirty = True
+        self.size += 1
+        self.ids.append(doc.get("_id"))
+        self.types.append(doc.get("type"))
+        return True
+
+    def scores(self, query_vector, query_type: str = "all", limit: int = None):
+        """
+        Return (row_indices, cosine_scores) for rows matching query_type.
+        With an ANN structure attached and a limit given, only the approximate
+        candidate set is scored; otherwise every matching row is.
+        """
+        # Queries come back at full model dimension; match Matryoshka-truncated storage
+        query = truncate_embedding(query_vector, self.dim)
+        query_norm = np.linalg.norm(query)
+        if self.size == 0 or query.shape[0] != self.dim or query_norm == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = query / query_norm
+
+        allowed = None
+        if query_type != "all":
+            allowed = np.asarray(self.types, dtype=object) == query_type
+
+        if self.ann is not None and limit:
+            return self.ann.search(self.matrix, query, allowed, limit)
+
+        if allowed is None:
+            return np.arange(self.size), self.matrix @ query
+        rows = np.flatnonzero(allowed)
+        return rows, self.matrix[rows] @ query
+
+
+class VectorIndexRegistry:
+    """
+    Per-user UserVectorIndex cache. Indexes are loaded lazily on first search,
+    updated in place on insert, refreshed after `max_age_seconds` (to pick up
+    writes from other workers) and evicted least-recently-used once the total
+    size exceeds `memory_budget_bytes`. Only documents matching `doc_filter`
+    (e.g. embedded with the active model) are loaded.
+    """
+
+    def __init__(self, collection, memory_budget_bytes: int = 512 * 1024 * 1024, max_age_seconds: float = 300,
+                 ann_backend: str = "exact", ann_min_rows: int = 5000, ann_dir: str = ".ann_index",
+                 ann_nprobe: int = 8, ann_ef: int = 64, doc_filter: dict = None):
+        self._collection = collection
+        self.doc_filter = doc_filter or {}
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_age_seconds = max_age_seconds
+        # ANN is only worth it past a few thousand rows; below that exact search is faster
+        self.ann_backend = ann_backend
+        self.ann_min_rows = ann_min_rows
+        self.ann_dir = ann_dir
+        self.ann_nprobe = ann_nprobe
+        self.ann_ef = ann_ef
+        self._indexes = OrderedDict()
+        self._locks = {}
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0, "incremental_adds": 0, "ann_builds": 0, "ann_loads": 0}
+
+    async def get(self, user_id: str) -> UserVectorIndex:
+        index = self._indexes.get(user_id)
+        if index is not None and time.monotonic() - index.loaded_at < self.max_age_seconds:
+            self._indexes.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return index
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(user_id)
+            if index is not None and time.monotonic() - index.loaded_at < self.max_age_seconds:
+                return index
+            index = await self._load(user_id)
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            self._evict()
+            return index
+
+    async def _load(self, user_id: str) -> UserVectorIndex:
+        # Phase one only needs ids, types and vectors; metadata is hydrated for winners
+        docs = []
+        with span("mongo.load_vectors", MONGO_DURATION, operation="load_vectors"):
+            cursor = self._collection.find({"user_id": user_id, **self.doc_filter}, {"_id": 1, "type": 1, "embedding": 1}).batch_size(1000)
+            async for doc in cursor:
+                embedding = doc.get("embedding")
+                if embedding is not None:
+                    # Binary vectors decode zero-copy; arrays become compact float32 instead of boxed floats
+                    doc["embedding"] = decode_embedding(embedding)
+                docs.append(doc)
+        self.stats["loads"] += 1
+        index = UserVectorIndex.from_documents(user_id, docs)
+        if self.ann_backend != "exact" and index.size >= self.ann_min_rows:
+            # k-means / graph construction is CPU heavy, keep it off the event loop
+            await asyncio.to_thread(self._attach_ann, index)
+        return index
+
+    def _attach_ann(self, index: UserVectorIndex):
+        ann = load_ann_index(self.ann_backend, self.ann_dir, index.user_id, index.matrix, index.ids, self.ann_nprobe, self.ann_ef)
+        if ann is None:
+            ann = create_ann_index(self.ann_backend, self.ann_nprobe, self.ann_ef)
+            ann.build(index.matrix)
+            self.stats["ann_builds"] += 1
+            self._persist(index, ann)
+        else:
+            self.stats["ann_loads"] += 1
+        index.ann = ann
+
+    def _persist(self, index: UserVectorIndex, ann=None):
+        ann = ann or index.ann
+        try:
+            ann.save(self.ann_dir, index.user_id, index.ids)
+            index.ann_dirty = False
+        except Exception as e:
+            logger.warning("ann_index_persist_failed", extra={"user_id": index.user_id, "error": str(e)})
+
+    def add_document(self, user_id: str, doc: dict):
+        """Append a freshly inserted document to the user's index if it is resident."""
+        index = self._indexes.get(user_id)
+        if index is None:
+            return
+        if index.dim == 0:
+            # Index was empty when loaded; drop it so the next search reloads with the right dimension
+            self._indexes.pop(user_id, None)
+            return
+        if index.add(doc):
+            self.stats["incremental_adds"] += 1
+            self._evict()
+
+    def invalidate(self, user_id: str = None):
+        if user_id is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(user_id, None)
+
+    def _evict(self):
+        # Always keep the most recently used index, even if it alone exceeds the budget
+        while len(self._indexes) > 1 and self.memory_bytes > self.memory_budget_bytes:
+            _, evicted = self._indexes.popitem(last=False)
+            self.stats["evictions"] += 1
+            if evicted.ann is not None and evicted.ann_dirty:
+                # Save graph updates so the next load does not rebuild from scratch
+                asyncio.get_running_loop().run_in_executor(None, self._persist, evicted)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(index.nbytes for index in self._indexes.values())
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "resident_users": len(self._indexes), "memory_bytes": self.memory_bytes}
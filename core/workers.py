@@ -0,0 +1,33 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from utils.config import get_worker_settings
+
+WORKER_PROCESSES = get_worker_settings()
+_process_pool = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Shared process pool for CPU-bound work (HTML extraction, image decoding)."""
+    global _process_pool
+    if _process_pool is None:
+        # Never fork: this process already runs Motor, thread pools and to_thread workers, and a
+        # child forked while one of their locks is held can hang
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _process_pool = ProcessPoolExecutor(max_workers=WORKER_PROCESSES or min(4, os.cpu_count() or 1),
+                                            mp_context=multiprocessing.get_context(start_method))
+    return _process_pool
+
+
+async def run_in_process(fn, *args):
+    """Run a picklable top-level function in the process pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), fn, *args)
+
+
+def shutdown_pools():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
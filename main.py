@@ -1,13 +1,71 @@
+# Imported first so the import phases below are timed; each mark covers the modules newly loaded since the last one
+from core.startup import startup_report
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+startup_report.mark("import.fastapi")
 from routes.login_routes import log_router
+startup_report.mark("import.routes.login")
 from routes.add_data_routes import data_router
+startup_report.mark("import.routes.add_data")
 from routes.search_data import search_router
+from routes.jobs_routes import jobs_router
+from routes.metrics_routes import metrics_router
+startup_report.mark("import.routes.other")
+from core.resources import resources
+from core.indexes import ensure_indexes
+from core.add_data import save_user_stuff, embedding_provider
+from core.log import configure_logging, get_logger
+from core.metrics import registry, StatsCollector
+from core.tracing import RequestTracingMiddleware
+from utils.config import get_index_settings, get_ingest_queue_settings, get_observability_settings
+startup_report.mark("import.core")
 
-app = FastAPI(title="Appointy Simple API")
+log_level, log_format, metrics_enabled = get_observability_settings()
+configure_logging(log_level, log_format)
+logger = get_logger("synapse.app")
+registry.register(StatsCollector("synapse_startup", "Cold start of this worker process.", startup_report.get_stats, nested_label="phase"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One Mongo pool, OpenAI client and HTTP fetcher per worker process
+    startup_report.mark("app_setup")
+    resources.start()
+    startup_report.mark("resources")
+    if embedding_provider.name == "local":
+        # Load the model now rather than on the first request
+        await asyncio.to_thread(embedding_provider.load)
+        startup_report.mark("embedding_model")
+    index_management = get_index_settings()
+    if index_management != "off":
+        try:
+            reports = await ensure_indexes(resources.db, resources.users_col.name, create=index_management == "ensure")
+            if any(r["status"] in ("missing", "drift", "error") for r in reports):
+                logger.warning("index_check", extra={"indexes": reports})
+            else:
+                logger.info("index_check", extra={"indexes": reports})
+        except Exception as e:
+            # Never block startup on index management; searches still work, just slower
+            logger.error("index_check_failed", extra={"error": str(e)})
+        startup_report.mark("index_check")
+    if get_ingest_queue_settings()[0] == "async":
+        resources.ingest_jobs.start(save_user_stuff)
+    startup_report.mark("ingest_workers")
+    startup_report.ready()
+    logger.info("startup", extra=startup_report.get_stats())
+    yield
+    await resources.close()
+
+app = FastAPI(title="Appointy Simple API", lifespan=lifespan)
+app.add_middleware(RequestTracingMiddleware)
 
 app.include_router(log_router)
 app.include_router(data_router)
 app.include_router(search_router)
+app.include_router(jobs_router)
+if metrics_enabled:
+    app.include_router(metrics_router)
 
 @app.get("/")
 def home():
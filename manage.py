@@ -0,0 +1,206 @@
+import argparse
+import asyncio
+import json
+import numpy as np
+from pymongo import UpdateOne
+from core.resources import get_resources
+from core.add_data import generate_embeddings, build_embedding_text, attach_embedding, EMBEDDING_MODEL, EMBEDDING_STORAGE_FORMAT, EMBEDDING_DIMENSIONS
+from core.embeddings import embedding_model_filter, backfill_embedding_model
+from core.embedding_codec import STORAGE_FORMATS, encode_embedding, decode_embedding, embedding_nbytes
+from core.vector_index import top_k
+from core.indexes import ensure_indexes, format_index_report
+from core.log import configure_logging
+from core.startup import import_time_breakdown
+
+
+async def reembed(user_id: str = None, page_size: int = 500, stale_only: bool = False):
+    """
+    Recompute embeddings for stored documents with the active embedding model.
+    Documents are processed in pages so memory stays bounded for large collections.
+    With `stale_only`, only documents embedded by another model are processed
+    (e.g. after switching EMBEDDING_PROVIDER); until then search skips them.
+    """
+    data_col = get_resources().data_col
+    backfilled = await backfill_embedding_model(data_col, user_id)
+    if backfilled:
+        print(f"… recorded the embedding model on {backfilled} older documents")
+    query = {"user_id": user_id} if user_id else {}
+    if stale_only:
+        query["$nor"] = [embedding_model_filter()]
+    cursor = data_col.find(query, {"title": 1, "summary": 1, "content": 1, "tags": 1, "category": 1}).batch_size(page_size)
+    updated = 0
+    page = []
+
+    async def flush(docs):
+        texts = [
+            build_embedding_text(d.get("title", ""), d.get("summary", ""), d.get("content", ""), d.get("tags", []), d.get("category", []))
+            for d in docs
+        ]
+        embeddings = await generate_embeddings(texts)
+        operations = []
+        for d, embedding in zip(docs, embeddings):
+            if embedding:
+                fields = attach_embedding({}, embedding)
+                operations.append(UpdateOne({"_id": d["_id"]}, {"$set": fields}))
+        if operations:
+            await data_col.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async for doc in cursor:
+        page.append(doc)
+        if len(page) >= page_size:
+            updated += await flush(page)
+            page = []
+            print(f"… re-embedded {updated} documents")
+    if page:
+        updated += await flush(page)
+
+    if get_resources().search_cache is not None:
+        await get_resources().search_cache.bump_all()
+    print(f"✅ Re-embedded {updated} documents with {EMBEDDING_MODEL}.")
+
+
+async def migrate_embeddings(storage_format: str, dimensions: int = 0, user_id: str = None, page_size: int = 1000):
+    """
+    Rewrite stored embeddings into another storage format / dimension.
+    int8 and truncation are lossy: run `recall-report` first and keep a backup,
+    the original doubles cannot be recovered afterwards.
+    """
+    data_col = get_resources().data_col
+    backfilled = await backfill_embedding_model(data_col, user_id)
+    if backfilled:
+        print(f"… recorded the embedding model on {backfilled} older documents")
+    query = {"user_id": user_id} if user_id else {}
+    cursor = data_col.find(query, {"embedding": 1}).batch_size(page_size)
+    migrated = 0
+    operations = []
+    async for doc in cursor:
+        if doc.get("embedding") is None:
+            continue
+        vector = decode_embedding(doc["embedding"])
+        if len(vector) == 0:
+            continue
+        stored_dim = min(dimensions, len(vector)) if dimensions else len(vector)
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"embedding": encode_embedding(vector, storage_format, dimensions),
+                                                                  "embedding_dim": stored_dim}}))
+        if len(operations) >= page_size:
+            await data_col.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+            operations = []
+            print(f"… migrated {migrated} documents")
+    if operations:
+        await data_col.bulk_write(operations, ordered=False)
+        migrated += len(operations)
+
+    if get_resources().search_cache is not None:
+        await get_resources().search_cache.bump_all()
+    print(f"✅ Migrated {migrated} documents to {storage_format}" + (f" ({dimensions} dims)." if dimensions else "."))
+
+
+async def recall_report(storage_format: str, dimensions: int = 0, user_id: str = None, sample: int = 200, k: int = 10, max_docs: int = 50000):
+    """
+    Compare top-k neighbours under full-precision vectors with those under the
+    candidate storage format. Each sampled document's own vector is used as the
+    query (excluding itself). Must run before migrating, against full-precision data.
+    """
+    query = {"user_id": user_id} if user_id else {}
+    vectors = []
+    async for doc in get_resources().data_col.find(query, {"embedding": 1}).limit(max_docs):
+        vector = decode_embedding(doc.get("embedding"))
+        if len(vector):
+            vectors.append(vector.astype(np.float32))
+    if len(vectors) <= k:
+        print("Not enough documents with embeddings for a recall report.")
+        return
+
+    full = np.vstack(vectors)
+    full /= np.linalg.norm(full, axis=1, keepdims=True)
+    compact = np.vstack([decode_embedding(encode_embedding(v, storage_format, dimensions)).astype(np.float32) for v in full])
+    compact /= np.linalg.norm(compact, axis=1, keepdims=True)
+
+    rng = np.random.default_rng(0)
+    rows = np.arange(len(full))
+    recalls = []
+    for q in rng.choice(len(full), size=min(sample, len(full)), replace=False):
+        full_scores = full @ full[q]
+        compact_scores = compact @ compact[q]
+        full_scores[q] = compact_scores[q] = -np.inf
+        truth = set(top_k(rows, full_scores, k)[0].tolist())
+        found = set(top_k(rows, compact_scores, k)[0].tolist())
+        recalls.append(len(truth & found) / k)
+
+    dim = full.shape[1]
+    stored_dim = compact.shape[1]
+    print(f"Documents compared : {len(full)}")
+    print(f"Format             : {storage_format} ({stored_dim} of {dim} dims)")
+    print(f"Bytes per vector   : {embedding_nbytes('array', dim)} -> {embedding_nbytes(storage_format, stored_dim)}")
+    print(f"Recall@{k:<11}: mean {np.mean(recalls):.4f}, min {np.min(recalls):.4f} over {len(recalls)} queries")
+
+
+async def check_indexes(create: bool = True, update_vector_index: bool = False) -> bool:
+    """Verify (and by default create) the declared indexes. Returns False when anything is missing or drifted."""
+    resources = get_resources()
+    reports = await ensure_indexes(resources.db, resources.users_col.name, create, update_vector_index)
+    print(format_index_report(reports))
+    return all(r["status"] in ("ok", "created", "updated", "unsupported") for r in reports)
+
+
+def startup_report(module: str, top: int, as_json: bool):
+    """Print where importing the API module spends its time (a proxy for worker cold start)."""
+    report = import_time_breakdown(module, top)
+    if as_json:
+        print(json.dumps(report))
+        return
+    print(f"import {module}: {report['total_ms']} ms")
+    for name, ms in report["packages"]:
+        print(f"  {ms:>8.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synapse Brain maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reembed_cmd = commands.add_parser("reembed", help="Recompute stored embeddings with the configured model")
+    reembed_cmd.add_argument("--user-id", help="Only re-embed this user's documents")
+    reembed_cmd.add_argument("--page-size", type=int, default=500)
+    reembed_cmd.add_argument("--stale-only", action="store_true", help="Only documents embedded with another model")
+
+    migrate_cmd = commands.add_parser("migrate-embeddings", help="Rewrite stored embeddings into another storage format")
+    migrate_cmd.add_argument("--format", choices=STORAGE_FORMATS, default=EMBEDDING_STORAGE_FORMAT)
+    migrate_cmd.add_argument("--dimensions", type=int, default=EMBEDDING_DIMENSIONS, help="Matryoshka truncation (0 = keep all)")
+    migrate_cmd.add_argument("--user-id")
+    migrate_cmd.add_argument("--page-size", type=int, default=1000)
+
+    recall_cmd = commands.add_parser("recall-report", help="Measure top-k recall of a storage format against full precision")
+    recall_cmd.add_argument("--format", choices=STORAGE_FORMATS, default="int8")
+    recall_cmd.add_argument("--dimensions", type=int, default=0)
+    recall_cmd.add_argument("--user-id")
+    recall_cmd.add_argument("--sample", type=int, default=200)
+    recall_cmd.add_argument("-k", type=int, default=10)
+
+    index_cmd = commands.add_parser("ensure-indexes", help="Create missing indexes and report drift")
+    index_cmd.add_argument("--check", action="store_true", help="Only report, do not create anything")
+    index_cmd.add_argument("--update-vector-index", action="store_true", help="Apply a changed Atlas vector_index definition")
+
+    startup_cmd = commands.add_parser("startup-report", help="Import-time breakdown of the API process")
+    startup_cmd.add_argument("--module", default="main")
+    startup_cmd.add_argument("--top", type=int, default=15)
+    startup_cmd.add_argument("--json", action="store_true", help="One JSON line, e.g. for tracking cold start in CI")
+
+    args = parser.parse_args()
+    configure_logging(log_format="text")
+    if args.command == "reembed":
+        asyncio.run(reembed(args.user_id, args.page_size, args.stale_only))
+    elif args.command == "migrate-embeddings":
+        asyncio.run(migrate_embeddings(args.format, args.dimensions, args.user_id, args.page_size))
+    elif args.command == "recall-report":
+        asyncio.run(recall_report(args.format, args.dimensions, args.user_id, args.sample, args.k))
+    elif args.command == "ensure-indexes":
+        healthy = asyncio.run(check_indexes(not args.check, args.update_vector_index))
+        raise SystemExit(0 if healthy else 1)
+    elif args.command == "startup-report":
+        startup_report(args.module, args.top, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException,status
+from fastapi import APIRouter, Depends, HTTPException,status,Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from core.add_data import save_user_stuff
+from core.bulk_import import import_items, iter_jsonl, iter_archive, MAX_MEMBER_BYTES
+from core.jobs import MAX_PAYLOAD_BYTES
+from core.resources import get_resources
+from utils.config import get_ingest_queue_settings, get_bulk_import_settings
 from fastapi import Form, File, UploadFile
 from typing import Optional,Union
 from auth import JWTBearer
+from tempfile import SpooledTemporaryFile
+import json
 data_router=APIRouter()
+INGEST_MODE=get_ingest_queue_settings()[0]
+BULK_CONCURRENCY,BULK_BATCH_SIZE,BULK_MAX_ITEMS,BULK_MAX_MB=get_bulk_import_settings()
 @data_router.post("/add", dependencies=[Depends(JWTBearer())], summary="Add new user data item")
 async def add_user_data(
     token_payload: dict = Depends(JWTBearer()),      
@@ -15,6 +24,8 @@ async def add_user_data(
     """
     Protected route to add user data (text, image, url).
     Extracts `user_id` from JWT payload automatically.
+    With INGEST_MODE=async the item is queued and a 202 with a job id is returned;
+    poll GET /jobs/{job_id} for the result.
     """
     if isinstance(image, str) or image is None:
         image = None
@@ -23,23 +34,35 @@ async def add_user_data(
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token: missing user ID")
         if data_type == "text" and text:
-            result = await save_user_stuff(user_id, "text", text)
+            payload = text
 
         elif data_type == "url" and url:
-            result = await save_user_stuff(user_id, "url", url)
+            payload = url
 
         elif data_type == "image" and image:
-            image_bytes = await image.read()
-            result = await save_user_stuff(user_id, "image", image_bytes)
+            payload = await image.read()
 
         else:
             raise HTTPException(status_code=400, detail="Invalid input for the selected data type.")
 
+        if INGEST_MODE == "async":
+            if len(payload) > MAX_PAYLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="Item too large to queue.")
+            job_id = await get_resources().ingest_jobs.enqueue(user_id, data_type, payload)
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/jobs/{job_id}"
+            })
+
+        result = await save_user_stuff(user_id, data_type, payload)
+
         return {
             "message": result["message"],
             "summary": result.get("summary"),
             "tags": result.get("tags"),
             "category": result.get("category"),
+            "timings": result.get("timings"),
             "status": "Successfully added to Synapse Brain"
         }
 
@@ -47,3 +70,61 @@ async def add_user_data(
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+
+@data_router.post("/add/bulk", dependencies=[Depends(JWTBearer())], summary="Bulk import text, URL and image items")
+async def bulk_import(request: Request, token_payload: dict = Depends(JWTBearer())):
+    """
+    Import many items in one request. Send either
+    - a JSON Lines body (Content-Type: application/x-ndjson), one item per line:
+      {"data_type": "text", "text": ...}, {"data_type": "url", "url": ...} or
+      {"data_type": "image", "image_base64": ...}, each with an optional "id"; or
+    - a multipart upload with a `file` field holding a .jsonl file or a .zip archive
+      of .txt/.md notes, images and .url/.webloc bookmarks.
+    Results stream back as JSON Lines, one per item ({"index", "id", "status", ...}),
+    followed by a {"summary": ...} line.
+    """
+    user_id = token_payload.get("uid")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token: missing user ID")
+    max_bytes = BULK_MAX_MB * 1024 * 1024
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form(max_files=1)
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            await form.close()
+            raise HTTPException(status_code=400, detail="Missing `file` upload.")
+        if upload.size is not None and upload.size > max_bytes:
+            await form.close()
+            raise HTTPException(status_code=413, detail="Import too large.")
+        if (upload.filename or "").lower().endswith(".zip"):
+            items = iter_archive(upload.file, MAX_MEMBER_BYTES)
+        else:
+            items = iter_jsonl(upload.file)
+        cleanup = form.close
+    else:
+        # Spool the body (to disk past 1 MB) so it is parsed lazily, not held in memory
+        spool = SpooledTemporaryFile(max_size=1024 * 1024)
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes:
+                spool.close()
+                raise HTTPException(status_code=413, detail="Import too large.")
+            spool.write(chunk)
+        spool.seek(0)
+        items = iter_jsonl(spool)
+
+        async def cleanup():
+            spool.close()
+
+    async def stream_results():
+        try:
+            async for result in import_items(user_id, items, BULK_CONCURRENCY, BULK_BATCH_SIZE, BULK_MAX_ITEMS):
+                yield json.dumps(result, default=str) + "\n"
+        finally:
+            await cleanup()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException
+from auth import JWTBearer
+from core.resources import get_resources
+
+jobs_router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+@jobs_router.get("/{job_id}", dependencies=[Depends(JWTBearer())], summary="Status of a queued ingestion job")
+async def job_status(job_id: str, token_payload: dict = Depends(JWTBearer())):
+    """
+    Report the status of an item queued by POST /add:
+    queued, running, done (with the saved summary/tags/category) or failed (with the error).
+    """
+    user_id = token_payload.get("uid")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token: missing user ID")
+    try:
+        job = await get_resources().ingest_jobs.get(job_id, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "job_id": job["job_id"],
+        "data_type": job["data_type"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
@@ -4,7 +4,6 @@ from models import SignupRequest, LoginRequest
 from core.credentials import register_user, login_user
 from utils.config import get_JWT_settings
 from auth import create_access_token
-from motor.motor_asyncio import AsyncIOMotorClient
 log_router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 algo,secrete_key2,time_in_min=get_JWT_settings()
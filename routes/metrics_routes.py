@@ -0,0 +1,47 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from auth import get_auth_stats
+from core.credentials import get_hash_stats
+from core.add_data import embedding_batcher
+from core.find_data import query_type_stats
+from core.metrics import registry, StatsCollector
+from core.resources import get_resources
+
+metrics_router = APIRouter(tags=["Metrics"])
+
+
+def _component_stats(name: str):
+    # Read at scrape time: components are created in the lifespan and may be disabled (None)
+    def stats():
+        component = getattr(get_resources(), name)
+        return component.get_stats() if component is not None else {}
+    return stats
+
+
+for _prefix, _doc, _fn in (
+    ("synapse_embedding_cache", "Embedding cache counters.", _component_stats("embedding_cache")),
+    ("synapse_url_cache", "Fetched page cache counters.", _component_stats("url_content_cache")),
+    ("synapse_enrichment_cache", "LLM enrichment cache counters.", _component_stats("enrichment_cache")),
+    ("synapse_url_fetcher", "URL fetcher counters.", lambda: get_resources().url_fetcher.stats),
+    ("synapse_vector_index", "Resident vector index counters.", _component_stats("vector_indexes")),
+    ("synapse_search_cache", "Search result cache counters.", _component_stats("search_cache")),
+    ("synapse_ingest_jobs", "Ingestion queue counters of this process.", lambda: get_resources().ingest_jobs.stats),
+    ("synapse_embedding_batcher", "Embedding micro-batcher counters.", embedding_batcher.get_stats),
+    ("synapse_query_type", "How query types were resolved.", lambda: query_type_stats),
+    ("synapse_password_hash", "Password hashing pool counters.", get_hash_stats),
+    ("synapse_auth", "JWT verification counters.", get_auth_stats),
+):
+    registry.register(StatsCollector(_prefix, _doc, _fn))
+
+for _limiter in ("chat", "embeddings"):
+    # Absent while OPENAI_RATE_LIMIT_ENABLED=false; the collector then renders nothing
+    registry.register(StatsCollector(
+        f"synapse_openai_{_limiter}_limiter", "OpenAI rate limiter state.",
+        lambda name=_limiter: get_resources().ai_client.get_stats()[name], nested_label="priority",
+    ))
+
+
+@metrics_router.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+def metrics():
+    """Latency histograms, counters and component stats in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
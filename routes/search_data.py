@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from auth import JWTBearer
-from core.add_data import generate_embedding 
 import math
-from core.find_data import vector_search,classify_query_type
+from core.find_data import search_user_data
+from core.rate_limiter import ai_priority
+from core.log import get_logger
 
 search_router = APIRouter(prefix="/data", tags=["Search"])
+logger = get_logger("synapse.search")
 
 @search_router.get("/search", dependencies=[Depends(JWTBearer())], summary="Semantic search across all user data")
 async def semantic_search(
@@ -20,15 +22,16 @@ async def semantic_search(
         user_id = token_payload.get("uid")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token or missing user ID.")
-        vector_query=await generate_embedding(query)
-        query_type=await classify_query_type(query)
-        print(query_type)
-        result=await vector_search(user_id,vector_query,query_type,limit)
+        # Someone is waiting on a search, so its OpenAI calls jump ahead of queued ingestion
+        with ai_priority("search"):
+            result,query_type,cached=await search_user_data(user_id,query,limit)
+        logger.info("search", extra={"query_type": query_type, "cached": cached, "results": len(result), "limit": limit})
 
         return {
             "query": query,
             "results_found": len(result),
-            "results": result
+            "results": result,
+            "cached": cached
         }
 
     except Exception as e:
@@ -1,8 +1,5 @@
-from pymongo import MongoClient
 from dotenv import load_dotenv
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
 
 def load_environments():
     load_dotenv()
@@ -21,4 +18,191 @@ def get_JWT_settings():
 def get_scraper():
     load_dotenv()
     scraper_api_key=os.getenv("SCRAPER_API_KEY")
-    return scraper_api_key
\ No newline at end of file
+    return scraper_api_key
+
+def get_enrichment_settings():
+    load_dotenv()
+    # "parallel" runs one prompt per field, "fused" asks for every field in one call
+    enrichment_mode=os.getenv("ENRICHMENT_MODE","parallel").lower()
+    return enrichment_mode
+
+def get_embedding_cache_settings():
+    load_dotenv()
+    cache_enabled=os.getenv("EMBEDDING_CACHE_ENABLED","true").lower()=="true"
+    cache_max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES","10000"))
+    cache_ttl_days=int(os.getenv("EMBEDDING_CACHE_TTL_DAYS","30"))
+    return cache_enabled,cache_max_entries,cache_ttl_days
+
+def get_embedding_settings():
+    load_dotenv()
+    embedding_model=os.getenv("EMBEDDING_MODEL","text-embedding-3-large")
+    batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE","64"))
+    batch_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS","10"))
+    batch_max_tokens=int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS","250000"))
+    batch_concurrency=int(os.getenv("EMBEDDING_BATCH_CONCURRENCY","4"))
+    return embedding_model,batch_size,batch_wait_ms,batch_max_tokens,batch_concurrency
+
+def get_embedding_provider_settings():
+    load_dotenv()
+    # "openai" (EMBEDDING_MODEL via the API) or "local" (a sentence-transformers model on this machine)
+    provider=os.getenv("EMBEDDING_PROVIDER","openai").lower()
+    local_model=os.getenv("LOCAL_EMBEDDING_MODEL","sentence-transformers/all-MiniLM-L6-v2")
+    # Batches encoded at the same time
+    local_threads=int(os.getenv("LOCAL_EMBEDDING_THREADS","2"))
+    local_batch_size=int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE","32"))
+    local_device=os.getenv("LOCAL_EMBEDDING_DEVICE","cpu")
+    # "onnx" / "openvino" need the matching sentence-transformers extra
+    local_backend=os.getenv("LOCAL_EMBEDDING_BACKEND","torch").lower()
+    return provider,local_model,local_threads,local_batch_size,local_device,local_backend
+
+def get_vector_index_settings():
+    load_dotenv()
+    memory_budget_mb=int(os.getenv("VECTOR_INDEX_MEMORY_MB","512"))
+    max_age_seconds=float(os.getenv("VECTOR_INDEX_MAX_AGE_SECONDS","300"))
+    return memory_budget_mb,max_age_seconds
+
+def get_ann_settings():
+    load_dotenv()
+    # "exact" (brute force), "ivf" (NumPy IVF-flat) or "hnsw" (needs hnswlib)
+    ann_backend=os.getenv("VECTOR_ANN_BACKEND","exact").lower()
+    ann_min_rows=int(os.getenv("VECTOR_ANN_MIN_ROWS","5000"))
+    ann_dir=os.getenv("VECTOR_ANN_DIR",".ann_index")
+    ann_nprobe=int(os.getenv("VECTOR_ANN_NPROBE","8"))
+    ann_ef=int(os.getenv("VECTOR_ANN_EF","64"))
+    return ann_backend,ann_min_rows,ann_dir,ann_nprobe,ann_ef
+
+def get_embedding_storage_settings():
+    load_dotenv()
+    # "array" (BSON doubles), "float32" or "int8" (BSON binary vectors)
+    storage_format=os.getenv("EMBEDDING_STORAGE_FORMAT","array").lower()
+    # Matryoshka truncation; 0 keeps the model's full dimension
+    storage_dimensions=int(os.getenv("EMBEDDING_DIMENSIONS","0"))
+    return storage_format,storage_dimensions
+
+def get_query_classifier_settings():
+    load_dotenv()
+    # "hybrid" (keyword rules, LLM only when unsure), "rules" or "llm"
+    classifier_mode=os.getenv("QUERY_TYPE_CLASSIFIER","hybrid").lower()
+    min_confidence=float(os.getenv("QUERY_TYPE_MIN_CONFIDENCE","0.8"))
+    memo_size=int(os.getenv("QUERY_TYPE_CACHE_SIZE","10000"))
+    return classifier_mode,min_confidence,memo_size
+
+def get_url_fetch_settings():
+    load_dotenv()
+    fetch_timeout=float(os.getenv("URL_FETCH_TIMEOUT","10"))
+    fetch_max_bytes=int(os.getenv("URL_FETCH_MAX_BYTES",str(5*1024*1024)))
+    fetch_per_host=int(os.getenv("URL_FETCH_PER_HOST","4"))
+    fetch_max_connections=int(os.getenv("URL_FETCH_MAX_CONNECTIONS","100"))
+    return fetch_timeout,fetch_max_bytes,fetch_per_host,fetch_max_connections
+
+def get_worker_settings():
+    load_dotenv()
+    # 0 picks min(4, CPU count)
+    worker_processes=int(os.getenv("WORKER_PROCESSES","0"))
+    return worker_processes
+
+def get_url_cache_settings():
+    load_dotenv()
+    url_cache_enabled=os.getenv("URL_CACHE_ENABLED","true").lower()=="true"
+    # Pages fetched more recently than this are served without any request
+    url_cache_fresh_seconds=int(os.getenv("URL_CACHE_FRESH_SECONDS","3600"))
+    url_cache_ttl_days=int(os.getenv("URL_CACHE_TTL_DAYS","30"))
+    return url_cache_enabled,url_cache_fresh_seconds,url_cache_ttl_days
+
+def get_image_settings():
+    load_dotenv()
+    image_max_side=int(os.getenv("IMAGE_MAX_SIDE","1024"))
+    # "jpeg" or "webp"
+    image_format=os.getenv("IMAGE_FORMAT","jpeg").upper()
+    image_quality=int(os.getenv("IMAGE_QUALITY","85"))
+    return image_max_side,image_format,image_quality
+
+def get_password_hash_settings():
+    load_dotenv()
+    # Changing the cost re-hashes each user's password on their next login
+    bcrypt_rounds=int(os.getenv("BCRYPT_ROUNDS","12"))
+    hash_workers=int(os.getenv("PASSWORD_HASH_WORKERS","4"))
+    return bcrypt_rounds,hash_workers
+
+def get_token_cache_settings():
+    load_dotenv()
+    token_cache_size=int(os.getenv("TOKEN_CACHE_SIZE","10000"))
+    return token_cache_size
+
+def get_mongo_client_settings():
+    load_dotenv()
+    max_pool_size=int(os.getenv("MONGO_MAX_POOL_SIZE","50"))
+    min_pool_size=int(os.getenv("MONGO_MIN_POOL_SIZE","0"))
+    max_idle_ms=int(os.getenv("MONGO_MAX_IDLE_MS","60000"))
+    connect_timeout_ms=int(os.getenv("MONGO_CONNECT_TIMEOUT_MS","5000"))
+    server_selection_timeout_ms=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS","5000"))
+    # 0 means no socket timeout
+    socket_timeout_ms=int(os.getenv("MONGO_SOCKET_TIMEOUT_MS","0"))
+    # Comma-separated, in order of preference, e.g. "zstd,snappy,zlib" (zstd/snappy need extra packages)
+    compressors=os.getenv("MONGO_COMPRESSORS","")
+    return max_pool_size,min_pool_size,max_idle_ms,connect_timeout_ms,server_selection_timeout_ms,socket_timeout_ms,compressors
+
+def get_openai_client_settings():
+    load_dotenv()
+    openai_timeout=float(os.getenv("OPENAI_TIMEOUT","60"))
+    openai_max_retries=int(os.getenv("OPENAI_MAX_RETRIES","2"))
+    openai_max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS","100"))
+    return openai_timeout,openai_max_retries,openai_max_connections
+
+def get_index_settings():
+    load_dotenv()
+    # "ensure" (create missing indexes on boot), "check" (report only) or "off"
+    index_management=os.getenv("INDEX_MANAGEMENT","ensure").lower()
+    return index_management
+
+def get_ingest_queue_settings():
+    load_dotenv()
+    # "sync" runs the pipeline inside POST /add, "async" queues it and returns 202 with a job id
+    ingest_mode=os.getenv("INGEST_MODE","sync").lower()
+    ingest_workers=int(os.getenv("INGEST_WORKERS","4"))
+    max_attempts=int(os.getenv("INGEST_MAX_ATTEMPTS","3"))
+    retry_backoff_seconds=float(os.getenv("INGEST_RETRY_BACKOFF_SECONDS","5"))
+    lease_seconds=float(os.getenv("INGEST_LEASE_SECONDS","300"))
+    # Finished jobs are removed after this many days
+    job_ttl_days=int(os.getenv("INGEST_JOB_TTL_DAYS","7"))
+    return ingest_mode,ingest_workers,max_attempts,retry_backoff_seconds,lease_seconds,job_ttl_days
+
+def get_openai_rate_limit_settings():
+    load_dotenv()
+    # When enabled the limiter owns retries and the SDK's own retries are turned off
+    rate_limit_enabled=os.getenv("OPENAI_RATE_LIMIT_ENABLED","true").lower()=="true"
+    # Per-minute quotas of the account tier; 0 disables that bucket
+    chat_rpm=int(os.getenv("OPENAI_CHAT_RPM","500"))
+    chat_tpm=int(os.getenv("OPENAI_CHAT_TPM","200000"))
+    embedding_rpm=int(os.getenv("OPENAI_EMBEDDING_RPM","3000"))
+    embedding_tpm=int(os.getenv("OPENAI_EMBEDDING_TPM","1000000"))
+    max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY","32"))
+    max_retries=int(os.getenv("OPENAI_RATE_LIMIT_RETRIES","5"))
+    backoff_seconds=float(os.getenv("OPENAI_RETRY_BACKOFF_SECONDS","1"))
+    return rate_limit_enabled,chat_rpm,chat_tpm,embedding_rpm,embedding_tpm,max_concurrency,max_retries,backoff_seconds
+
+def get_bulk_import_settings():
+    load_dotenv()
+    # Items fetched / enriched at once per import request
+    bulk_concurrency=int(os.getenv("BULK_IMPORT_CONCURRENCY","16"))
+    # Documents embedded and inserted together
+    bulk_batch_size=int(os.getenv("BULK_IMPORT_BATCH_SIZE","100"))
+    bulk_max_items=int(os.getenv("BULK_IMPORT_MAX_ITEMS","10000"))
+    bulk_max_mb=int(os.getenv("BULK_IMPORT_MAX_MB","512"))
+    return bulk_concurrency,bulk_batch_size,bulk_max_items,bulk_max_mb
+
+def get_search_cache_settings():
+    load_dotenv()
+    search_cache_enabled=os.getenv("SEARCH_CACHE_ENABLED","true").lower()=="true"
+    search_cache_size=int(os.getenv("SEARCH_CACHE_SIZE","5000"))
+    # Keep per-user generation counters in MongoDB so every worker process sees inserts
+    search_cache_shared=os.getenv("SEARCH_CACHE_SHARED","true").lower()=="true"
+    return search_cache_enabled,search_cache_size,search_cache_shared
+
+def get_observability_settings():
+    load_dotenv()
+    log_level=os.getenv("LOG_LEVEL","INFO")
+    # "json" for log shippers, "text" for reading in a terminal
+    log_format=os.getenv("LOG_FORMAT","json").lower()
+    metrics_enabled=os.getenv("METRICS_ENABLED","true").lower()=="true"
+    return log_level,log_format,metrics_enabled